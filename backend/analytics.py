@@ -0,0 +1,175 @@
+"""
+Seat-demand analytics for the admin dashboard.
+
+Works on the occupancy arrays returned by Repository.load_occupancy(): one
+entry per booked seat, holding its showtime index, seat position and how
+many hours before the show it was booked. Every metric is computed with
+bincount/cumsum over those arrays, never per booking in Python.
+"""
+
+from typing import List, Optional
+
+import numpy as np
+
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+# The sell-out curve runs from this many days before the show to showtime;
+# earlier bookings count towards the first point
+SELLOUT_CURVE_DAYS = 30
+
+
+def rounded(values: np.ndarray, digits: int = 4) -> List[Optional[float]]:
+    """List of floats with NaN as None, for JSON"""
+    return [None if np.isnan(value) else round(float(value), digits) for value in values]
+
+
+def codes(labels: List[str]):
+    """Map labels to integer codes in order of first appearance"""
+    order = list(dict.fromkeys(labels))
+    index = {label: code for code, label in enumerate(order)}
+    return order, np.fromiter((index[label] for label in labels), dtype=np.int32, count=len(labels))
+
+
+def seat_heatmap(seats: List[dict], seat_fill: np.ndarray, seat_lead: np.ndarray) -> dict:
+    """Fill rate and mean booking lead time per seat, as row x seat number grids"""
+    rows, row_codes = codes([seat["row_label"] for seat in seats])
+    numbers = np.fromiter((seat["seat_number"] for seat in seats), dtype=np.int32, count=len(seats))
+    columns = np.unique(numbers)
+    column_codes = np.searchsorted(columns, numbers)
+
+    fill = np.full((len(rows), len(columns)), np.nan)
+    lead = np.full((len(rows), len(columns)), np.nan)
+    fill[row_codes, column_codes] = seat_fill
+    lead[row_codes, column_codes] = seat_lead
+
+    return {
+        "rows": rows,
+        "seat_numbers": columns.tolist(),
+        "fill_rate": [rounded(row) for row in fill],
+        "mean_lead_hours": [rounded(row, 1) for row in lead]
+    }
+
+
+def slot_heatmap(showtimes: List[dict], show_idx: np.ndarray, capacity: int) -> dict:
+    """Fill rate by weekday and start hour of the show"""
+    weekday = np.fromiter((s["show_date"].weekday() for s in showtimes), dtype=np.int32, count=len(showtimes))
+    hour = np.fromiter((s["show_time"].hour for s in showtimes), dtype=np.int32, count=len(showtimes))
+    slot = weekday * 24 + hour
+
+    shows = np.bincount(slot, minlength=7 * 24).reshape(7, 24)
+    booked = np.bincount(slot[show_idx], minlength=7 * 24).reshape(7, 24)
+    hours = np.flatnonzero(shows.sum(axis=0))
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        fill = booked[:, hours] / (shows[:, hours] * capacity)
+
+    return {
+        "weekdays": WEEKDAYS,
+        "hours": hours.tolist(),
+        "shows": shows[:, hours].tolist(),
+        "fill_rate": [rounded(row) for row in fill]
+    }
+
+
+def sellout_curve(show_idx: np.ndarray, lead: np.ndarray, n_shows: int, capacity: int) -> dict:
+    """How full shows are N days out, and how early sold-out shows filled up"""
+    days = SELLOUT_CURVE_DAYS + 1
+    bucket = np.minimum(lead // 24, SELLOUT_CURVE_DAYS).astype(np.int64)
+    per_day = np.bincount(show_idx * days + bucket, minlength=n_shows * days).reshape(n_shows, days)
+    # Column d: seats booked at least d days before the show
+    booked_by = np.cumsum(per_day[:, ::-1], axis=1)[:, ::-1]
+    fill_by = booked_by / capacity
+
+    # The last seat of a sold-out show is its booking with the smallest lead
+    last_booking = np.full(n_shows, np.inf)
+    np.minimum.at(last_booking, show_idx, lead)
+    sold_out = booked_by[:, 0] >= capacity
+    sellout_lead = last_booking[sold_out]
+
+    return {
+        "days_before_show": list(range(SELLOUT_CURVE_DAYS, -1, -1)),
+        "mean_fill_rate": rounded(fill_by.mean(axis=0)[::-1]),
+        "median_fill_rate": rounded(np.median(fill_by, axis=0)[::-1]),
+        "sold_out_shows": int(sold_out.sum()),
+        "median_hours_before_show_at_sellout": (
+            round(float(np.median(sellout_lead)), 1) if sellout_lead.size else None
+        )
+    }
+
+
+def seat_type_demand(seats: List[dict], seat_idx: np.ndarray, lead: np.ndarray,
+                     n_shows: int) -> List[dict]:
+    """Fill rate and booking lead time per seat type"""
+    types, type_codes = codes([seat["seat_type"] for seat in seats])
+    booking_types = type_codes[seat_idx]
+    seats_per_type = np.bincount(type_codes, minlength=len(types))
+    bookings = np.bincount(booking_types, minlength=len(types))
+
+    # Sorting once by type lets each type's leads be sliced out for the median
+    order = np.argsort(booking_types, kind="stable")
+    bounds = np.searchsorted(booking_types[order], np.arange(len(types) + 1))
+    sorted_lead = lead[order]
+
+    demand = []
+    for code, seat_type in enumerate(types):
+        type_lead = sorted_lead[bounds[code]:bounds[code + 1]]
+        demand.append({
+            "seat_type": seat_type,
+            "seats": int(seats_per_type[code]),
+            "bookings": int(bookings[code]),
+            "fill_rate": round(float(bookings[code] / (seats_per_type[code] * n_shows)), 4),
+            "median_lead_hours": round(float(np.median(type_lead)), 1) if type_lead.size else None
+        })
+    return demand
+
+
+def empty_demand(n_shows: int) -> dict:
+    """seat_demand()'s response when there is nothing to fill: empty grids, no rates"""
+    return {
+        "showtimes": n_shows,
+        "bookings": 0,
+        "fill_rate": None,
+        "seat_heatmap": {"rows": [], "seat_numbers": [], "fill_rate": [], "mean_lead_hours": []},
+        "slot_heatmap": {
+            "weekdays": WEEKDAYS,
+            "hours": [],
+            "shows": [[] for _ in WEEKDAYS],
+            "fill_rate": [[] for _ in WEEKDAYS]
+        },
+        "sellout_curve": {
+            "days_before_show": list(range(SELLOUT_CURVE_DAYS, -1, -1)),
+            "mean_fill_rate": [None] * (SELLOUT_CURVE_DAYS + 1),
+            "median_fill_rate": [None] * (SELLOUT_CURVE_DAYS + 1),
+            "sold_out_shows": 0,
+            "median_hours_before_show_at_sellout": None
+        },
+        "seat_types": []
+    }
+
+
+def seat_demand(occupancy: dict) -> dict:
+    """All dashboard metrics for one theater's occupancy"""
+    seats, showtimes = occupancy["seats"], occupancy["showtimes"]
+    capacity, n_shows = len(seats), len(showtimes)
+    show_idx = np.asarray(occupancy["showtime_index"], dtype=np.int64)
+    seat_idx = np.asarray(occupancy["seat_index"], dtype=np.int64)
+    # Bookings made after the show started count as made at showtime
+    lead = np.maximum(np.asarray(occupancy["lead_hours"], dtype=np.float64), 0)
+
+    # Nothing to divide by: no shows in the range, or a theater without seats
+    if not n_shows or not capacity:
+        return empty_demand(n_shows)
+
+    seat_bookings = np.bincount(seat_idx, minlength=capacity)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        seat_lead = np.bincount(seat_idx, weights=lead, minlength=capacity) / seat_bookings
+
+    return {
+        "showtimes": n_shows,
+        "bookings": int(seat_idx.size),
+        "fill_rate": round(seat_idx.size / (capacity * n_shows), 4),
+        "seat_heatmap": seat_heatmap(seats, seat_bookings / n_shows, seat_lead),
+        "slot_heatmap": slot_heatmap(showtimes, show_idx, capacity),
+        "sellout_curve": sellout_curve(show_idx, lead, n_shows, capacity),
+        "seat_types": seat_type_demand(seats, seat_idx, lead, n_shows)
+    }
@@ -0,0 +1,131 @@
+"""
+Archive reservation partitions for past showtimes.
+
+Monthly partitions of reservations / reservation_seats whose whole month ended
+more than --retention-days ago are detached from the hot tables and attached
+to archive.reservations / archive.reservation_seats. Booking and availability
+queries then never see them, while reservations_all / reservation_seats_all
+(used by reservation history and admin reports) still do. Optionally the
+archived partitions are moved to a cheaper tablespace.
+
+The job also makes sure hot partitions exist for the coming months.
+
+Usage:
+    python archive_partitions.py [--retention-days N] [--tablespace NAME] [--dry-run]
+"""
+
+import argparse
+from datetime import date, timedelta
+from typing import List, Optional
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
+
+PARTITIONED_TABLES = ("reservation_seats", "reservations")
+FUTURE_MONTHS = 12
+
+
+def month_bounds(suffix: str):
+    """Turn a partition suffix like 202401 into its [start, end) dates"""
+    start = date(int(suffix[:4]), int(suffix[4:6]), 1)
+    end = date(start.year + start.month // 12, start.month % 12 + 1, 1)
+    return start, end
+
+
+def hot_partitions(conn) -> List[str]:
+    rows = conn.execute(text("""
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE i.inhparent = 'public.reservations'::regclass
+        AND n.nspname = 'public'
+    """)).fetchall()
+    return sorted(row[0][len("reservations_p"):] for row in rows)
+
+
+def archive_month(conn, suffix: str, tablespace: Optional[str]):
+    start, end = month_bounds(suffix)
+    # A detached seats partition keeps its foreign key to public.reservations,
+    # which would block detaching the month's reservations; it is dropped here
+    # and replaced by archive.reservation_seats' key when the partition is
+    # attached there, after the reservations it points at
+    seats_partition = f"reservation_seats_p{suffix}"
+    conn.execute(text(f"ALTER TABLE public.reservation_seats DETACH PARTITION public.{seats_partition}"))
+    for (constraint,) in conn.execute(text(f"""
+        SELECT conname FROM pg_constraint
+        WHERE conrelid = 'public.{seats_partition}'::regclass
+        AND confrelid = 'public.reservations'::regclass
+    """)).fetchall():
+        conn.execute(text(f'ALTER TABLE public.{seats_partition} DROP CONSTRAINT "{constraint}"'))
+
+    for table in ("reservations", "reservation_seats"):
+        partition = f"{table}_p{suffix}"
+        if table == "reservations":
+            conn.execute(text(f"ALTER TABLE public.{table} DETACH PARTITION public.{partition}"))
+        conn.execute(text(f"ALTER TABLE public.{partition} SET SCHEMA archive"))
+        if tablespace:
+            conn.execute(text(f'ALTER TABLE archive.{partition} SET TABLESPACE "{tablespace}"'))
+        conn.execute(text(f"""
+            ALTER TABLE archive.{table} ATTACH PARTITION archive.{partition}
+            FOR VALUES FROM ('{start}') TO ('{end}')
+        """))
+
+
+def run(engine: Engine, retention_days: int, tablespace: Optional[str], dry_run: bool) -> List[str]:
+    cutoff = date.today() - timedelta(days=retention_days)
+
+    with engine.connect() as conn:
+        candidates = [
+            suffix for suffix in hot_partitions(conn)
+            if month_bounds(suffix)[1] <= cutoff
+        ]
+
+    if dry_run:
+        return candidates
+
+    # One short transaction per month so the parent tables are only locked
+    # briefly while a partition is detached
+    for suffix in candidates:
+        with engine.begin() as conn:
+            archive_month(conn, suffix, tablespace)
+
+    with engine.begin() as conn:
+        conn.execute(
+            text("SELECT create_reservation_partitions(:start, :end)"),
+            {"start": date.today(), "end": date.today() + timedelta(days=31 * FUTURE_MONTHS)}
+        )
+
+    # Freeze archived rows so they are never rewritten by later vacuums
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for suffix in candidates:
+            for table in PARTITIONED_TABLES:
+                conn.execute(text(f"VACUUM (FREEZE, ANALYZE) archive.{table}_p{suffix}"))
+
+    return candidates
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive past reservation partitions")
+    parser.add_argument("--retention-days", type=int, default=30,
+                        help="keep months that ended less than this many days ago hot")
+    parser.add_argument("--tablespace", help="move archived partitions to this tablespace")
+    parser.add_argument("--dry-run", action="store_true", help="only list partitions to archive")
+    parser.add_argument("--database-url", help="defaults to the API's DATABASE_URL")
+    args = parser.parse_args()
+
+    if args.database_url:
+        engine = create_engine(args.database_url)
+    else:
+        from main import engine
+
+    archived = run(engine, args.retention_days, args.tablespace, args.dry_run)
+    action = "would archive" if args.dry_run else "archived"
+    for suffix in archived:
+        print(f"{action}  {suffix[:4]}-{suffix[4:]}")
+    if not archived:
+        print("Nothing to archive")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Micro-benchmarks for the API handlers, run on the in-memory repository.
+
+No database is needed: the API is imported with STORAGE_BACKEND=memory,
+seeded directly through the repository and driven with FastAPI's test
+client, so the numbers show the cost of the handlers and serialization
+alone. Also times the repository calls on their own, and the seat-demand
+analytics over a generated year of bookings for a whole chain.
+
+Usage:
+    python bench_repository.py [--showtimes N] [--iterations N] [--chain-theaters N]
+"""
+
+import argparse
+import os
+import time
+from datetime import date, timedelta, time as clock
+
+import numpy as np
+
+os.environ["STORAGE_BACKEND"] = "memory"
+
+from fastapi.testclient import TestClient
+
+import main
+from analytics import seat_demand
+
+
+def seed(repo, showtimes: int):
+    theaters = [
+        repo.add_theater(f"Theater {i}", rows=10, seats_per_row=20, seat_types={"J": "vip"})
+        for i in range(1, 5)
+    ]
+    movies = [
+        repo.create_movie({
+            "title": f"Movie {i}",
+            "description": None,
+            "poster_image": None,
+            "genre": "Drama",
+            "duration_minutes": 120,
+            "release_date": date(2025, 1, 1),
+            "rating": "PG"
+        })
+        for i in range(1, 11)
+    ]
+    first_day = date.today() + timedelta(days=1)
+    created = []
+    for i in range(showtimes):
+        created.append(repo.create_showtime({
+            "movie_id": movies[i % len(movies)]["id"],
+            "theater_id": theaters[i % len(theaters)]["id"],
+            "show_date": first_day + timedelta(days=i // 20),
+            "show_time": clock(10 + (i // len(theaters)) % 5 * 3),
+            "price": 12.5
+        }))
+    repo.add_user("bench@example.com", main.hash_password("bench"), "Bench")
+    return created
+
+
+def bench(name: str, iterations: int, call):
+    call()
+    start = time.perf_counter()
+    for i in range(iterations):
+        call()
+    elapsed = time.perf_counter() - start
+    print(f"{name:40} {elapsed / iterations * 1e6:10.1f} us/op")
+
+
+def year_of_occupancy(rng: np.random.Generator, rows: int = 15, seats_per_row: int = 20,
+                      shows_per_day: int = 5) -> dict:
+    """A theater's year: every show 30-100% full, front rows selling earlier"""
+    first_day = date.today() - timedelta(days=365)
+    seats = [
+        {
+            "row_label": chr(65 + row),
+            "seat_number": number,
+            "seat_type": "vip" if row >= rows - 2 else "premium" if row >= rows - 5 else "standard"
+        }
+        for row in range(rows)
+        for number in range(1, seats_per_row + 1)
+    ]
+    showtimes = [
+        {"show_date": first_day + timedelta(days=day), "show_time": clock(11 + slot * 3)}
+        for day in range(365)
+        for slot in range(shows_per_day)
+    ]
+    capacity = len(seats)
+    sold = rng.integers(int(capacity * 0.3), capacity + 1, size=len(showtimes))
+    showtime_index = np.repeat(np.arange(len(showtimes)), sold)
+    seat_index = np.concatenate([rng.permutation(capacity)[:count] for count in sold])
+    lead_hours = rng.exponential(72, size=seat_index.size) * (1 + seat_index // seats_per_row / rows)
+    return {
+        "seats": seats,
+        "showtimes": showtimes,
+        "showtime_index": showtime_index,
+        "seat_index": seat_index,
+        "lead_hours": lead_hours
+    }
+
+
+def run():
+    parser = argparse.ArgumentParser(description="Benchmark the API on the in-memory repository")
+    parser.add_argument("--showtimes", type=int, default=200)
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--chain-theaters", type=int, default=20)
+    args = parser.parse_args()
+
+    repo = main.memory_repository
+    showtimes = seed(repo, args.showtimes)
+    showtime_id = showtimes[0]["id"]
+    seats = [seat["id"] for seat in repo.get_seat_layouts()[showtimes[0]["theater_id"]]]
+    user_id = repo.get_user_by_email("bench@example.com")["id"]
+
+    client = TestClient(main.app)
+    token = client.post(
+        "/api/auth/login", json={"email": "bench@example.com", "password": "bench"}
+    ).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    print("Repository")
+    bench("list_showtimes", args.iterations, lambda: repo.list_showtimes())
+    bench("get_showtime_detail", args.iterations, lambda: repo.get_showtime_detail(showtime_id))
+    bench("get_showtime_versions", args.iterations, lambda: repo.get_showtime_versions(showtime_id))
+
+    # Book and cancel the same seats so every iteration succeeds
+    def book_and_cancel():
+        reservation = repo.reserve_seats(user_id, {showtime_id: seats[:4]})[0]
+        repo.cancel_reservation(reservation["id"], reservation["show_date"])
+    bench("reserve_seats + cancel (4 seats)", args.iterations, book_and_cancel)
+
+    print("API")
+    bench("GET /api/showtimes", args.iterations, lambda: client.get("/api/showtimes"))
+    bench(
+        "GET /api/showtimes/{id}", args.iterations,
+        lambda: client.get(f"/api/showtimes/{showtime_id}")
+    )
+    etag = client.get(f"/api/showtimes/{showtime_id}").headers["ETag"]
+    bench(
+        "GET /api/showtimes/{id} (304)", args.iterations,
+        lambda: client.get(f"/api/showtimes/{showtime_id}", headers={"If-None-Match": etag})
+    )
+    booking = iter(range(1, len(seats)))
+    bench(
+        "POST /api/reservations (1 seat)", min(args.iterations, len(seats) - 2),
+        lambda: client.post(
+            "/api/reservations", headers=headers,
+            json={"showtime_id": showtime_id, "seat_ids": [seats[next(booking)]]}
+        )
+    )
+    bench("GET /api/reservations", args.iterations, lambda: client.get("/api/reservations", headers=headers))
+
+    print("Analytics")
+    rng = np.random.default_rng(0)
+    theaters = [year_of_occupancy(rng) for _ in range(args.chain_theaters)]
+    bookings = sum(theater["seat_index"].size for theater in theaters)
+    start = time.perf_counter()
+    for occupancy in theaters:
+        seat_demand(occupancy)
+    elapsed = time.perf_counter() - start
+    print(f"seat_demand, {args.chain_theaters} theaters x 1 year ({bookings:,} booked seats): {elapsed:.2f} s")
+
+
+if __name__ == "__main__":
+    run()
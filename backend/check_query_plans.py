@@ -0,0 +1,42 @@
+"""
+EXPLAIN regression check for the API's hot queries.
+
+Runs tests/test_query_plans.py against a Postgres server: it creates a
+throwaway database there, fills it with a generated dataset and fails if any
+endpoint's query plan falls back to a sequential scan on a large table.
+
+Usage:
+    python check_query_plans.py [--database-url URL] [--scale N]
+
+The check is only meaningful at a realistic size: on tiny tables a sequential
+scan is the cheapest plan, so keep --scale at its default or above.
+"""
+
+import argparse
+import os
+import sys
+
+import pytest
+
+TEST_MODULE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tests", "test_query_plans.py")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check query plans for sequential scans")
+    parser.add_argument("--database-url", help="defaults to the API's DATABASE_URL")
+    parser.add_argument("--scale", type=int, default=10, help="dataset size multiplier")
+    args = parser.parse_args()
+
+    if args.database_url:
+        database_url = args.database_url
+    else:
+        from main import engine
+        database_url = engine.url.render_as_string(hide_password=False)
+
+    os.environ["TEST_DATABASE_URL"] = database_url
+    os.environ["PLAN_CHECK_SCALE"] = str(args.scale)
+    sys.exit(pytest.main(["-q", TEST_MODULE]))
+
+
+if __name__ == "__main__":
+    main()
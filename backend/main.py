@@ -3,23 +3,30 @@ Movie Reservation System - FastAPI Backend
 Fixed version with bcrypt compatibility
 """
 
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import BackgroundTasks, FastAPI, Depends, HTTPException, Request, Response, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import Session, sessionmaker
-from sqlalchemy.exc import IntegrityError
+from fastapi.responses import JSONResponse
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError, TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import sessionmaker
 import bcrypt  # Changed from passlib to bcrypt
 from jose import JWTError, jwt
+from contextlib import ExitStack, asynccontextmanager, contextmanager
 from datetime import datetime, timedelta, date, time
-from typing import List, Optional
-from pydantic import BaseModel, EmailStr
+from time import monotonic, sleep
+from typing import Callable, Iterator, List, NamedTuple, Optional
+from pydantic import BaseModel, EmailStr, condecimal
 import uuid
-import random
-import string
 import os
 from dotenv import load_dotenv
 
+from analytics import seat_demand
+from repositories import (
+    ConflictError, DeadlineExceededError, MemoryRepository, NotFoundError, PostgresRepository,
+    Repository, RepositoryError
+)
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -30,9 +37,24 @@ DB_HOST = "localhost"
 DB_PORT = "5432"
 DB_NAME = os.getenv("dB_NAME")
 DATABASE_URL = f"postgresql://{DB_USERNAME}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-engine = create_engine(DATABASE_URL, pool_pre_ping=True)
+POOL_SIZE = int(os.getenv("POOL_SIZE", "5"))
+MAX_OVERFLOW = int(os.getenv("MAX_OVERFLOW", "10"))
+POOL_TIMEOUT_SECONDS = float(os.getenv("POOL_TIMEOUT_SECONDS", "2"))
+engine = create_engine(
+    DATABASE_URL, pool_pre_ping=True, pool_size=POOL_SIZE, max_overflow=MAX_OVERFLOW,
+    pool_timeout=POOL_TIMEOUT_SECONDS
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Reports get their own small pool so slow reports can't starve bookings
+REPORT_POOL_SIZE = int(os.getenv("REPORT_POOL_SIZE", "2"))
+REPORT_POOL_TIMEOUT_SECONDS = float(os.getenv("REPORT_POOL_TIMEOUT_SECONDS", "5"))
+report_engine = create_engine(
+    DATABASE_URL, pool_pre_ping=True, pool_size=REPORT_POOL_SIZE, max_overflow=0,
+    pool_timeout=REPORT_POOL_TIMEOUT_SECONDS
+)
+ReportSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=report_engine)
+
 # Security Configuration
 SECRET_KEY = "your-secret-key-change-in-production"
 ALGORITHM = "HS256"
@@ -40,7 +62,19 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 1440  # 24 hours
 
 security = HTTPBearer()
 
-app = FastAPI(title="Movie Reservation API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.ready = False
+    try:
+        warm_up()
+    except Exception as e:
+        # /readyz keeps retrying, so the worker turns ready once the database is back
+        print(f"Startup warmup failed: {e}")
+    yield
+    engine.dispose()
+    report_engine.dispose()
+
+app = FastAPI(title="Movie Reservation API", lifespan=lifespan)
 
 # CORS Configuration
 app.add_middleware(
@@ -101,10 +135,18 @@ class SeatResponse(BaseModel):
     seat_type: str
     is_available: bool
 
+class ShowtimeDetailResponse(ShowtimeResponse):
+    movie: MovieResponse
+    total_seats: int
+    seats: List[SeatResponse]
+
 class ReservationCreate(BaseModel):
     showtime_id: str
     seat_ids: List[str]
 
+class CartCheckout(BaseModel):
+    items: List[ReservationCreate]
+
 class ReservationResponse(BaseModel):
     id: str
     booking_reference: str
@@ -118,14 +160,146 @@ class ReservationResponse(BaseModel):
     status: str
     created_at: datetime
 
-# Database dependency
-def get_db():
-    db = SessionLocal()
+class RepriceRequest(BaseModel):
+    start_date: date
+    end_date: date
+    # Matches showtimes.price, NUMERIC(10, 2)
+    price: condecimal(gt=0, max_digits=10, decimal_places=2)
+    movie_id: Optional[str] = None
+    theater_id: Optional[str] = None
+
+class BulkJobResponse(BaseModel):
+    id: str
+    kind: str
+    status: str
+    unit: str
+    total: int
+    processed: int
+    reservations_cancelled: int
+    refunded_amount: float
+    error: Optional[str]
+    started_at: datetime
+    updated_at: datetime
+    finished_at: Optional[datetime]
+
+# Storage
+# STORAGE_BACKEND=memory keeps everything in process, which lets the API run
+# without a database (tests, benchmarks, frontend work)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "postgres")
+memory_repository = MemoryRepository() if STORAGE_BACKEND == "memory" else None
+
+# Request Deadlines
+# Every route runs under a deadline: the pool it borrows connections from
+# (which bounds the wait for one) and a time budget that starts when its
+# repository is opened. Each statement may only run for what is left of the
+# budget, however many statements and transactions the route needs. Waiting
+# too long for a connection returns 503; a statement cancelled by the
+# deadline, or one started after it passed, returns 504.
+class Deadline(NamedTuple):
+    sessions: sessionmaker
+    budget_ms: int
+
+API_DEADLINE = Deadline(SessionLocal, 2000)
+# Bookings may queue behind other carts' seat locks
+BOOKING_DEADLINE = Deadline(SessionLocal, 5000)
+REPORT_DEADLINE = Deadline(ReportSessionLocal, 30000)
+
+QUERY_CANCELED = "57014"
+
+@contextmanager
+def open_repository(deadline: Deadline = API_DEADLINE) -> Iterator[Repository]:
+    if memory_repository is not None:
+        yield memory_repository
+        return
+    db = deadline.sessions()
     try:
-        yield db
+        yield PostgresRepository(db, monotonic() + deadline.budget_ms / 1000)
     finally:
         db.close()
 
+def repository_dependency(deadline: Deadline) -> Callable[[], Iterator[Repository]]:
+    def dependency():
+        with open_repository(deadline) as repo:
+            yield repo
+    return dependency
+
+get_repository = repository_dependency(API_DEADLINE)
+get_booking_repository = repository_dependency(BOOKING_DEADLINE)
+get_report_repository = repository_dependency(REPORT_DEADLINE)
+
+# Catalog Cache
+# Movies, theaters and seat layouts change rarely, so each worker keeps a copy.
+# Admin edits clear this worker's copy; other workers pick them up within
+# CATALOG_TTL_SECONDS.
+#
+# Handlers run in the threadpool, so the copy is never changed in place: a
+# reload swaps in a new snapshot, and each request keeps using the one it got.
+CATALOG_TTL_SECONDS = int(os.getenv("CATALOG_TTL_SECONDS", "60"))
+
+catalog: Optional[dict] = None
+
+def load_catalog(repo: Repository) -> dict:
+    global catalog
+    snapshot = {
+        "movies": repo.list_movies(),
+        "theaters": repo.list_theaters(),
+        "seat_layouts": repo.get_seat_layouts(),
+        "loaded_at": monotonic()
+    }
+    catalog = snapshot
+    return snapshot
+
+def get_catalog(repo: Repository) -> dict:
+    snapshot = catalog
+    if snapshot is None or monotonic() - snapshot["loaded_at"] > CATALOG_TTL_SECONDS:
+        snapshot = load_catalog(repo)
+    return snapshot
+
+def clear_catalog():
+    global catalog
+    catalog = None
+
+# Startup Warmup
+# Connections are opened before the worker reports ready, so the first
+# requests after a deploy don't pay for connection setup or cold caches
+WARM_CONNECTIONS = min(int(os.getenv("WARM_CONNECTIONS", str(POOL_SIZE))), POOL_SIZE)
+
+def warm_up():
+    """Open WARM_CONNECTIONS pooled connections, run the hot statements on each and load the catalog"""
+    with ExitStack() as stack:
+        repos = [stack.enter_context(open_repository()) for _ in range(WARM_CONNECTIONS)]
+        for repo in repos:
+            repo.warm_up()
+    with open_repository() as repo:
+        load_catalog(repo)
+    app.state.ready = True
+
+@app.exception_handler(NotFoundError)
+async def not_found_handler(request: Request, exc: NotFoundError):
+    return JSONResponse(status_code=404, content={"detail": exc.detail})
+
+@app.exception_handler(ConflictError)
+async def conflict_handler(request: Request, exc: ConflictError):
+    return JSONResponse(status_code=400, content={"detail": exc.detail})
+
+@app.exception_handler(PoolTimeoutError)
+async def pool_timeout_handler(request: Request, exc: PoolTimeoutError):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server is busy, please try again"},
+        headers={"Retry-After": "1"}
+    )
+
+@app.exception_handler(DeadlineExceededError)
+async def deadline_exceeded_handler(request: Request, exc: DeadlineExceededError):
+    return JSONResponse(status_code=504, content={"detail": exc.detail})
+
+@app.exception_handler(OperationalError)
+async def operational_error_handler(request: Request, exc: OperationalError):
+    if getattr(exc.orig, "pgcode", None) == QUERY_CANCELED:
+        return JSONResponse(status_code=504, content={"detail": "Request took too long"})
+    raise exc
+
 # Utility Functions - FIXED BCRYPT IMPLEMENTATION
 def hash_password(password: str) -> str:
     """Hash password using bcrypt"""
@@ -150,14 +324,8 @@ def create_access_token(data: dict) -> str:
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-def generate_booking_reference() -> str:
-    return ''.join(random.choices(string.ascii_uppercase + string.digits, k=10))
-
 # Authentication Dependencies
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-):
+def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     token = credentials.credentials
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
@@ -166,21 +334,16 @@ async def get_current_user(
             raise HTTPException(status_code=401, detail="Invalid token")
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
-    
-    result = db.execute(
-        text("SELECT id, email, full_name, role FROM users WHERE id = :id"),
-        {"id": user_id}
-    ).fetchone()
-    
-    if result is None:
+
+    # A short session of its own, so a report request doesn't also hold a
+    # connection from the main pool while it runs
+    with open_repository() as repo:
+        user = repo.get_user(user_id)
+
+    if user is None:
         raise HTTPException(status_code=401, detail="User not found")
-    
-    return {
-        "id": str(result[0]),
-        "email": result[1],
-        "full_name": result[2],
-        "role": result[3]
-    }
+
+    return user
 
 async def require_admin(current_user: dict = Depends(get_current_user)):
     if current_user["role"] != "admin":
@@ -189,64 +352,36 @@ async def require_admin(current_user: dict = Depends(get_current_user)):
 
 # Authentication Endpoints
 @app.post("/api/auth/signup", response_model=UserResponse)
-async def signup(user: UserCreate, db: Session = Depends(get_db)):
+def signup(user: UserCreate, repo: Repository = Depends(get_repository)):
     # Check if user exists
-    existing = db.execute(
-        text("SELECT id FROM users WHERE email = :email"),
-        {"email": user.email}
-    ).fetchone()
-    
-    if existing:
+    if repo.get_user_by_email(user.email):
         raise HTTPException(status_code=400, detail="Email already registered")
-    
+
     # Create user
     hashed_password = hash_password(user.password)
-    result = db.execute(
-        text("""
-            INSERT INTO users (email, password_hash, full_name, role)
-            VALUES (:email, :password_hash, :full_name, 'user')
-            RETURNING id, email, full_name, role
-        """),
-        {
-            "email": user.email,
-            "password_hash": hashed_password,
-            "full_name": user.full_name
-        }
-    )
-    db.commit()
-    
-    user_data = result.fetchone()
-    return UserResponse(
-        id=str(user_data[0]),
-        email=user_data[1],
-        full_name=user_data[2],
-        role=user_data[3]
-    )
+    return UserResponse(**repo.create_user(user.email, hashed_password, user.full_name))
 
 @app.post("/api/auth/login")
-async def login(credentials: UserLogin, db: Session = Depends(get_db)):
-    result = db.execute(
-        text("SELECT id, email, password_hash, full_name, role FROM users WHERE email = :email"),
-        {"email": credentials.email}
-    ).fetchone()
-    
-    if not result:
+def login(credentials: UserLogin, repo: Repository = Depends(get_repository)):
+    user = repo.get_user_by_email(credentials.email)
+
+    if not user:
         raise HTTPException(status_code=401, detail="Invalid credentials")
-    
+
     # Verify password
-    if not verify_password(credentials.password, result[2]):
+    if not verify_password(credentials.password, user["password_hash"]):
         raise HTTPException(status_code=401, detail="Invalid credentials")
-    
-    access_token = create_access_token({"sub": str(result[0])})
-    
+
+    access_token = create_access_token({"sub": user["id"]})
+
     return {
         "access_token": access_token,
         "token_type": "bearer",
         "user": {
-            "id": str(result[0]),
-            "email": result[1],
-            "full_name": result[3],
-            "role": result[4]
+            "id": user["id"],
+            "email": user["email"],
+            "full_name": user["full_name"],
+            "role": user["role"]
         }
     }
 
@@ -256,602 +391,443 @@ async def get_me(current_user: dict = Depends(get_current_user)):
 
 # Movie Endpoints
 @app.get("/api/movies", response_model=List[MovieResponse])
-async def get_movies(
+def get_movies(
     genre: Optional[str] = None,
-    db: Session = Depends(get_db)
+    repo: Repository = Depends(get_repository)
 ):
-    query = "SELECT id, title, description, poster_image, genre, duration_minutes, release_date, rating, is_active FROM movies WHERE is_active = true"
-    params = {}
-    
-    if genre:
-        query += " AND genre = :genre"
-        params["genre"] = genre
-    
-    query += " ORDER BY release_date DESC"
-    
-    results = db.execute(text(query), params).fetchall()
-    
-    return [
-        MovieResponse(
-            id=str(row[0]),
-            title=row[1],
-            description=row[2],
-            poster_image=row[3],
-            genre=row[4],
-            duration_minutes=row[5],
-            release_date=row[6],
-            rating=row[7],
-            is_active=row[8]
-        )
-        for row in results
-    ]
+    movies = get_catalog(repo)["movies"]
+    return [MovieResponse(**movie) for movie in movies if not genre or movie["genre"] == genre]
 
 @app.get("/api/movies/{movie_id}", response_model=MovieResponse)
-async def get_movie(movie_id: str, db: Session = Depends(get_db)):
-    result = db.execute(
-        text("""
-            SELECT id, title, description, poster_image, genre, 
-                   duration_minutes, release_date, rating, is_active
-            FROM movies WHERE id = :id
-        """),
-        {"id": movie_id}
-    ).fetchone()
-    
-    if not result:
+def get_movie(movie_id: str, repo: Repository = Depends(get_repository)):
+    # Inactive movies aren't cached but can still be fetched by id
+    movie = next(
+        (movie for movie in get_catalog(repo)["movies"] if movie["id"] == movie_id),
+        None
+    ) or repo.get_movie(movie_id)
+
+    if not movie:
         raise HTTPException(status_code=404, detail="Movie not found")
-    
-    return MovieResponse(
-        id=str(result[0]),
-        title=result[1],
-        description=result[2],
-        poster_image=result[3],
-        genre=result[4],
-        duration_minutes=result[5],
-        release_date=result[6],
-        rating=result[7],
-        is_active=result[8]
-    )
+
+    return MovieResponse(**movie)
 
 @app.post("/api/movies", response_model=MovieResponse)
-async def create_movie(
+def create_movie(
     movie: MovieCreate,
     current_user: dict = Depends(require_admin),
-    db: Session = Depends(get_db)
+    repo: Repository = Depends(get_repository)
 ):
-    result = db.execute(
-        text("""
-            INSERT INTO movies (title, description, poster_image, genre, 
-                               duration_minutes, release_date, rating)
-            VALUES (:title, :description, :poster_image, :genre, 
-                    :duration_minutes, :release_date, :rating)
-            RETURNING id, title, description, poster_image, genre, 
-                     duration_minutes, release_date, rating, is_active
-        """),
-        {
-            "title": movie.title,
-            "description": movie.description,
-            "poster_image": movie.poster_image,
-            "genre": movie.genre,
-            "duration_minutes": movie.duration_minutes,
-            "release_date": movie.release_date,
-            "rating": movie.rating
-        }
-    )
-    db.commit()
-    
-    row = result.fetchone()
-    return MovieResponse(
-        id=str(row[0]),
-        title=row[1],
-        description=row[2],
-        poster_image=row[3],
-        genre=row[4],
-        duration_minutes=row[5],
-        release_date=row[6],
-        rating=row[7],
-        is_active=row[8]
-    )
+    created = repo.create_movie(movie.model_dump())
+    clear_catalog()
+    return MovieResponse(**created)
 
 @app.put("/api/movies/{movie_id}", response_model=MovieResponse)
-async def update_movie(
+def update_movie(
     movie_id: str,
     movie: MovieCreate,
     current_user: dict = Depends(require_admin),
-    db: Session = Depends(get_db)
+    repo: Repository = Depends(get_repository)
 ):
-    result = db.execute(
-        text("""
-            UPDATE movies SET
-                title = :title,
-                description = :description,
-                poster_image = :poster_image,
-                genre = :genre,
-                duration_minutes = :duration_minutes,
-                release_date = :release_date,
-                rating = :rating
-            WHERE id = :id
-            RETURNING id, title, description, poster_image, genre, 
-                     duration_minutes, release_date, rating, is_active
-        """),
-        {
-            "id": movie_id,
-            "title": movie.title,
-            "description": movie.description,
-            "poster_image": movie.poster_image,
-            "genre": movie.genre,
-            "duration_minutes": movie.duration_minutes,
-            "release_date": movie.release_date,
-            "rating": movie.rating
-        }
-    )
-    db.commit()
-    
-    row = result.fetchone()
-    if not row:
+    updated = repo.update_movie(movie_id, movie.model_dump())
+    clear_catalog()
+
+    if not updated:
         raise HTTPException(status_code=404, detail="Movie not found")
-    
-    return MovieResponse(
-        id=str(row[0]),
-        title=row[1],
-        description=row[2],
-        poster_image=row[3],
-        genre=row[4],
-        duration_minutes=row[5],
-        release_date=row[6],
-        rating=row[7],
-        is_active=row[8]
-    )
+
+    return MovieResponse(**updated)
 
 @app.delete("/api/movies/{movie_id}")
-async def delete_movie(
+def delete_movie(
     movie_id: str,
     current_user: dict = Depends(require_admin),
-    db: Session = Depends(get_db)
+    repo: Repository = Depends(get_repository)
 ):
-    result = db.execute(
-        text("UPDATE movies SET is_active = false WHERE id = :id RETURNING id"),
-        {"id": movie_id}
-    )
-    db.commit()
-    
-    if not result.fetchone():
+    deleted = repo.deactivate_movie(movie_id)
+    clear_catalog()
+
+    if not deleted:
         raise HTTPException(status_code=404, detail="Movie not found")
-    
+
     return {"message": "Movie deleted successfully"}
 
 # Showtime Endpoints
 @app.get("/api/showtimes")
-async def get_showtimes(
+def get_showtimes(
     movie_id: Optional[str] = None,
     show_date: Optional[date] = None,
-    db: Session = Depends(get_db)
+    repo: Repository = Depends(get_repository)
 ):
-    query = """
-        SELECT 
-            s.id, s.movie_id, s.theater_id, s.show_date, s.show_time, 
-            s.price, s.is_active,
-            m.title as movie_title,
-            t.name as theater_name,
-            t.total_seats - COALESCE(COUNT(rs.id), 0) as available_seats
-        FROM showtimes s
-        JOIN movies m ON s.movie_id = m.id
-        JOIN theaters t ON s.theater_id = t.id
-        LEFT JOIN reservation_seats rs ON s.id = rs.showtime_id
-            AND rs.reservation_id IN (
-                SELECT id FROM reservations WHERE status = 'confirmed'
-            )
-        WHERE s.is_active = true
-    """
-    params = {}
-    
-    if movie_id:
-        query += " AND s.movie_id = :movie_id"
-        params["movie_id"] = movie_id
-    
-    if show_date:
-        query += " AND s.show_date = :show_date"
-        params["show_date"] = show_date
-    
-    query += """ 
-        GROUP BY s.id, s.movie_id, s.theater_id, s.show_date, s.show_time,
-                 s.price, s.is_active, m.title, t.name, t.total_seats
-        ORDER BY s.show_date, s.show_time
-    """
-    
-    results = db.execute(text(query), params).fetchall()
-    
-    return [
-        ShowtimeResponse(
-            id=str(row[0]),
-            movie_id=str(row[1]),
-            theater_id=str(row[2]),
-            show_date=row[3],
-            show_time=row[4],
-            price=float(row[5]),
-            is_active=row[6],
-            movie_title=row[7],
-            theater_name=row[8],
-            available_seats=row[9]
-        )
-        for row in results
-    ]
+    return [ShowtimeResponse(**showtime) for showtime in repo.list_showtimes(movie_id, show_date)]
 
 @app.post("/api/showtimes", response_model=ShowtimeResponse)
-async def create_showtime(
+def create_showtime(
     showtime: ShowtimeCreate,
     current_user: dict = Depends(require_admin),
-    db: Session = Depends(get_db)
+    repo: Repository = Depends(get_repository)
 ):
-    try:
-        result = db.execute(
-            text("""
-                INSERT INTO showtimes (movie_id, theater_id, show_date, show_time, price)
-                VALUES (:movie_id, :theater_id, :show_date, :show_time, :price)
-                RETURNING id, movie_id, theater_id, show_date, show_time, price, is_active
-            """),
-            {
-                "movie_id": showtime.movie_id,
-                "theater_id": showtime.theater_id,
-                "show_date": showtime.show_date,
-                "show_time": showtime.show_time,
-                "price": showtime.price
-            }
-        )
-        db.commit()
-        
-        row = result.fetchone()
-        return ShowtimeResponse(
-            id=str(row[0]),
-            movie_id=str(row[1]),
-            theater_id=str(row[2]),
-            show_date=row[3],
-            show_time=row[4],
-            price=float(row[5]),
-            is_active=row[6]
-        )
-    except IntegrityError:
-        db.rollback()
-        raise HTTPException(status_code=400, detail="Theater already has a show at this time")
+    return ShowtimeResponse(**repo.create_showtime(showtime.model_dump()))
 
 @app.get("/api/showtimes/{showtime_id}/seats", response_model=List[SeatResponse])
-async def get_showtime_seats(
+def get_showtime_seats(
     showtime_id: str,
-    db: Session = Depends(get_db)
+    repo: Repository = Depends(get_repository)
 ):
-    results = db.execute(
-        text("""
-            SELECT 
-                s.id, s.row_label, s.seat_number, s.seat_type,
-                CASE WHEN rs.id IS NULL THEN true ELSE false END as is_available
-            FROM seats s
-            JOIN showtimes sh ON s.theater_id = sh.theater_id
-            LEFT JOIN reservation_seats rs ON s.id = rs.seat_id 
-                AND rs.showtime_id = :showtime_id
-                AND rs.reservation_id IN (
-                    SELECT id FROM reservations WHERE status = 'confirmed'
-                )
-            WHERE sh.id = :showtime_id
-            ORDER BY s.row_label, s.seat_number
-        """),
-        {"showtime_id": showtime_id}
-    ).fetchall()
-    
+    booked = repo.get_booked_seats(showtime_id)
+    if not booked:
+        return []
+
+    theater_id, booked_seat_ids = booked
+    seat_layouts = get_catalog(repo)["seat_layouts"]
+    if theater_id not in seat_layouts:
+        # A theater added since the catalog was loaded
+        seat_layouts = load_catalog(repo)["seat_layouts"]
+
     return [
-        SeatResponse(
-            id=str(row[0]),
-            row_label=row[1],
-            seat_number=row[2],
-            seat_type=row[3],
-            is_available=row[4]
-        )
-        for row in results
+        SeatResponse(**seat, is_available=seat["id"] not in booked_seat_ids)
+        for seat in seat_layouts.get(theater_id, [])
     ]
 
+def showtime_etag(showtime_version: int, movie_version: int) -> str:
+    return f'W/"{showtime_version}.{movie_version}"'
+
+@app.get("/api/showtimes/{showtime_id}", response_model=ShowtimeDetailResponse)
+def get_showtime_detail(
+    showtime_id: str,
+    request: Request,
+    response: Response,
+    repo: Repository = Depends(get_repository)
+):
+    """Showtime, movie, theater and seat map in one response, with ETag support"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        versions = repo.get_showtime_versions(showtime_id)
+        if versions and showtime_etag(*versions) == if_none_match:
+            return Response(
+                status_code=304,
+                headers={"ETag": if_none_match, "Cache-Control": "no-cache"}
+            )
+
+    detail = repo.get_showtime_detail(showtime_id)
+
+    if not detail:
+        raise HTTPException(status_code=404, detail="Showtime not found")
+
+    response.headers["ETag"] = showtime_etag(detail["version"], detail["movie_version"])
+    response.headers["Cache-Control"] = "no-cache"
+
+    return ShowtimeDetailResponse(**detail)
+
 # Reservation Endpoints
+def reserve_seats(repo: Repository, user_id: str, items: List[ReservationCreate]) -> List[ReservationResponse]:
+    """
+    Book seats across one or more showtimes, all or nothing.
+
+    Ids are normalised and duplicates dropped here; the repository does the
+    locking and availability checks.
+    """
+    seats_by_showtime = {}
+    try:
+        for item in items:
+            seat_ids = seats_by_showtime.setdefault(str(uuid.UUID(item.showtime_id)), [])
+            for seat_id in map(str, map(uuid.UUID, item.seat_ids)):
+                if seat_id not in seat_ids:
+                    seat_ids.append(seat_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid showtime or seat id")
+
+    if not seats_by_showtime or not all(seats_by_showtime.values()):
+        raise HTTPException(status_code=400, detail="Select at least one seat per showtime")
+
+    try:
+        reservations = repo.reserve_seats(user_id, seats_by_showtime)
+    except (HTTPException, RepositoryError, PoolTimeoutError, OperationalError):
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return [ReservationResponse(**reservation) for reservation in reservations]
+
 @app.post("/api/reservations", response_model=ReservationResponse)
-async def create_reservation(
+def create_reservation(
     reservation: ReservationCreate,
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    repo: Repository = Depends(get_booking_repository)
 ):
-    try:
-        showtime_result = db.execute(
-            text("""
-                SELECT s.id, s.price, m.title, s.show_date, s.show_time, t.name
-                FROM showtimes s
-                JOIN movies m ON s.movie_id = m.id
-                JOIN theaters t ON s.theater_id = t.id
-                WHERE s.id = :showtime_id AND s.is_active = true
-                FOR UPDATE
-            """),
-            {"showtime_id": reservation.showtime_id}
-        ).fetchone()
-        
-        if not showtime_result:
-            raise HTTPException(status_code=404, detail="Showtime not found")
-        
-        seat_check = db.execute(
-            text("""
-                SELECT s.id, s.row_label, s.seat_number, s.seat_type
-                FROM seats s
-                WHERE s.id = ANY(:seat_ids)
-                AND NOT EXISTS (
-                    SELECT 1 FROM reservation_seats rs
-                    JOIN reservations r ON rs.reservation_id = r.id
-                    WHERE rs.seat_id = s.id 
-                    AND rs.showtime_id = :showtime_id
-                    AND r.status = 'confirmed'
-                )
-                FOR UPDATE OF s
-            """),
-            {
-                "seat_ids": reservation.seat_ids,
-                "showtime_id": reservation.showtime_id
-            }
-        ).fetchall()
-        
-        if len(seat_check) != len(reservation.seat_ids):
-            raise HTTPException(
-                status_code=400, 
-                detail="One or more seats are not available or do not exist"
-            )
-        
-        total_price = showtime_result[1] * len(reservation.seat_ids)
-        booking_ref = generate_booking_reference()
-        
-        reservation_result = db.execute(
-            text("""
-                INSERT INTO reservations 
-                    (user_id, showtime_id, total_price, booking_reference, status)
-                VALUES (:user_id, :showtime_id, :total_price, :booking_ref, 'confirmed')
-                RETURNING id, created_at
-            """),
-            {
-                "user_id": current_user["id"],
-                "showtime_id": reservation.showtime_id,
-                "total_price": total_price,
-                "booking_ref": booking_ref
-            }
-        ).fetchone()
-        
-        reservation_id = str(reservation_result[0])
-        created_at = reservation_result[1]
-        
-        for seat_id in reservation.seat_ids:
-            db.execute(
-                text("""
-                    INSERT INTO reservation_seats 
-                        (reservation_id, showtime_id, seat_id)
-                    VALUES (:reservation_id, :showtime_id, :seat_id)
-                """),
-                {
-                    "reservation_id": reservation_id,
-                    "showtime_id": reservation.showtime_id,
-                    "seat_id": seat_id
-                }
-            )
-        
-        db.commit()
-        
-        seats = [
-            {
-                "id": str(seat[0]),
-                "row_label": seat[1],
-                "seat_number": seat[2],
-                "seat_type": seat[3]
-            }
-            for seat in seat_check
-        ]
-        
-        return ReservationResponse(
-            id=reservation_id,
-            booking_reference=booking_ref,
-            showtime_id=reservation.showtime_id,
-            movie_title=showtime_result[2],
-            show_date=showtime_result[3],
-            show_time=showtime_result[4],
-            theater_name=showtime_result[5],
-            seats=seats,
-            total_price=total_price,
-            status="confirmed",
-            created_at=created_at
-        )
-        
-    except IntegrityError:
-        db.rollback()
-        raise HTTPException(
-            status_code=400, 
-            detail="Seats are already booked. Please select different seats."
-        )
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
+    return reserve_seats(repo, current_user["id"], [reservation])[0]
+
+@app.post("/api/cart/checkout", response_model=List[ReservationResponse])
+def checkout_cart(
+    cart: CartCheckout,
+    current_user: dict = Depends(get_current_user),
+    repo: Repository = Depends(get_booking_repository)
+):
+    """Reserve seats for several showtimes at once - all or nothing"""
+    return reserve_seats(repo, current_user["id"], cart.items)
 
 @app.get("/api/reservations", response_model=List[ReservationResponse])
-async def get_user_reservations(
+def get_user_reservations(
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    repo: Repository = Depends(get_repository)
 ):
-    results = db.execute(
-        text("""
-            SELECT DISTINCT
-                r.id, r.booking_reference, r.showtime_id, r.total_price, 
-                r.status, r.created_at,
-                m.title as movie_title,
-                s.show_date, s.show_time,
-                t.name as theater_name
-            FROM reservations r
-            JOIN showtimes s ON r.showtime_id = s.id
-            JOIN movies m ON s.movie_id = m.id
-            JOIN theaters t ON s.theater_id = t.id
-            WHERE r.user_id = :user_id
-            ORDER BY r.created_at DESC
-        """),
-        {"user_id": current_user["id"]}
-    ).fetchall()
-    
-    reservations = []
-    for row in results:
-        seats_result = db.execute(
-            text("""
-                SELECT s.id, s.row_label, s.seat_number, s.seat_type
-                FROM reservation_seats rs
-                JOIN seats s ON rs.seat_id = s.id
-                WHERE rs.reservation_id = :reservation_id
-            """),
-            {"reservation_id": str(row[0])}
-        ).fetchall()
-        
-        seats = [
-            {
-                "id": str(seat[0]),
-                "row_label": seat[1],
-                "seat_number": seat[2],
-                "seat_type": seat[3]
-            }
-            for seat in seats_result
-        ]
-        
-        reservations.append(
-            ReservationResponse(
-                id=str(row[0]),
-                booking_reference=row[1],
-                showtime_id=str(row[2]),
-                total_price=float(row[3]),
-                status=row[4],
-                created_at=row[5],
-                movie_title=row[6],
-                show_date=row[7],
-                show_time=row[8],
-                theater_name=row[9],
-                seats=seats
-            )
-        )
-    
-    return reservations
+    return [
+        ReservationResponse(**reservation)
+        for reservation in repo.list_user_reservations(current_user["id"])
+    ]
 
 @app.delete("/api/reservations/{reservation_id}")
-async def cancel_reservation(
+def cancel_reservation(
     reservation_id: str,
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    repo: Repository = Depends(get_booking_repository)
 ):
-    result = db.execute(
-        text("""
-            SELECT r.id, s.show_date, s.show_time
-            FROM reservations r
-            JOIN showtimes s ON r.showtime_id = s.id
-            WHERE r.id = :reservation_id 
-            AND r.user_id = :user_id 
-            AND r.status = 'confirmed'
-        """),
-        {
-            "reservation_id": reservation_id,
-            "user_id": current_user["id"]
-        }
-    ).fetchone()
-    
-    if not result:
+    reservation = repo.get_confirmed_reservation(current_user["id"], reservation_id)
+
+    if not reservation:
         raise HTTPException(status_code=404, detail="Reservation not found")
-    
-    show_datetime = datetime.combine(result[1], result[2])
+
+    show_datetime = datetime.combine(reservation["show_date"], reservation["show_time"])
     if show_datetime < datetime.now():
         raise HTTPException(status_code=400, detail="Cannot cancel past reservations")
-    
-    db.execute(
-        text("""
-            UPDATE reservations 
-            SET status = 'cancelled', cancelled_at = CURRENT_TIMESTAMP
-            WHERE id = :reservation_id
-        """),
-        {"reservation_id": reservation_id}
-    )
-    db.commit()
-    
+
+    repo.cancel_reservation(reservation_id, reservation["show_date"])
+
     return {"message": "Reservation cancelled successfully"}
 
+# Admin Bulk Operations
+# Bulk jobs run in the background as a series of short transactions of at
+# most BULK_CHUNK_SIZE rows, so hot tables are never locked for long. Their
+# progress is stored after every chunk, so any worker can report it. Each
+# job can be started again if its worker dies: it picks up what is left.
+BULK_CHUNK_SIZE = 500
+BULK_CHUNK_PAUSE_SECONDS = 0.05
+
+def save_bulk_job(job: dict):
+    with open_repository() as repo:
+        repo.save_bulk_job(job)
+
+def run_bulk_job(job: dict, work: Callable[[dict], None]):
+    try:
+        work(job)
+        job["status"] = "completed"
+    except Exception as e:
+        job["status"] = "failed"
+        job["error"] = str(e)
+    finally:
+        save_bulk_job(job)
+
+def run_in_chunks(job: dict, step: Callable[[Repository, int], List]) -> Iterator[List]:
+    """
+    Call a chunked repository write until it stops returning rows, one
+    transaction per chunk. The caller tallies each chunk into the job, which
+    is saved before the next one.
+    """
+    while True:
+        with open_repository(BOOKING_DEADLINE) as repo:
+            rows = step(repo, BULK_CHUNK_SIZE)
+        if not rows:
+            return
+        yield rows
+        save_bulk_job(job)
+        sleep(BULK_CHUNK_PAUSE_SECONDS)
+
+def cancel_showtime_reservations(job: dict, showtime_id: str, show_date: date):
+    """Cancel every confirmed reservation of a showtime and tally the refunds"""
+    chunks = run_in_chunks(
+        job,
+        lambda repo, chunk_size: repo.cancel_reservations_chunk(showtime_id, show_date, chunk_size)
+    )
+    for refunds in chunks:
+        job["reservations_cancelled"] += len(refunds)
+        job["refunded_amount"] += sum(refunds)
+        if job["unit"] == "reservations":
+            job["processed"] += len(refunds)
+
+@app.post("/api/admin/showtimes/{showtime_id}/cancel", response_model=BulkJobResponse, status_code=202)
+def cancel_showtime(
+    showtime_id: str,
+    background_tasks: BackgroundTasks,
+    current_user: dict = Depends(require_admin),
+    repo: Repository = Depends(get_repository)
+):
+    """Deactivate a showtime and cancel (refund) all of its confirmed reservations"""
+    show_date = repo.deactivate_showtime(showtime_id)
+
+    if not show_date:
+        raise HTTPException(status_code=404, detail="Showtime not found")
+
+    total = repo.count_confirmed_reservations(showtime_id, show_date)
+
+    job = repo.create_bulk_job("cancel_showtime", "reservations", total)
+    background_tasks.add_task(
+        run_bulk_job, job,
+        lambda job: cancel_showtime_reservations(job, showtime_id, show_date)
+    )
+    return BulkJobResponse(**job)
+
+@app.post("/api/admin/movies/{movie_id}/deactivate-showtimes", response_model=BulkJobResponse, status_code=202)
+def deactivate_movie_showtimes(
+    movie_id: str,
+    background_tasks: BackgroundTasks,
+    current_user: dict = Depends(require_admin),
+    repo: Repository = Depends(get_repository)
+):
+    """
+    Deactivate a movie's upcoming showtimes and cancel their reservations.
+    Showtimes left inactive with reservations by an interrupted run are
+    picked up again.
+    """
+    total = repo.count_upcoming_showtimes(movie_id)
+
+    def work(job: dict):
+        chunks = run_in_chunks(
+            job,
+            lambda repo, chunk_size: repo.deactivate_upcoming_showtimes_chunk(movie_id, chunk_size)
+        )
+        for showtimes in chunks:
+            for showtime_id, show_date in showtimes:
+                cancel_showtime_reservations(job, showtime_id, show_date)
+            job["processed"] += len(showtimes)
+
+    job = repo.create_bulk_job("deactivate_movie_showtimes", "showtimes", total)
+    background_tasks.add_task(run_bulk_job, job, work)
+    return BulkJobResponse(**job)
+
+@app.post("/api/admin/showtimes/reprice", response_model=BulkJobResponse, status_code=202)
+def reprice_showtimes(
+    reprice: RepriceRequest,
+    background_tasks: BackgroundTasks,
+    current_user: dict = Depends(require_admin),
+    repo: Repository = Depends(get_repository)
+):
+    """Set the ticket price of active showtimes in a date range"""
+    if reprice.end_date < reprice.start_date:
+        raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+
+    filters = reprice.model_dump()
+    total = repo.count_showtimes_to_reprice(filters)
+
+    def work(job: dict):
+        cursor = {"after_id": str(uuid.UUID(int=0))}
+        chunks = run_in_chunks(
+            job,
+            lambda repo, chunk_size: repo.reprice_showtimes_chunk(filters, cursor["after_id"], chunk_size)
+        )
+        for repriced in chunks:
+            cursor["after_id"] = repriced[-1]
+            job["processed"] += len(repriced)
+
+    job = repo.create_bulk_job("reprice_showtimes", "showtimes", total)
+    background_tasks.add_task(run_bulk_job, job, work)
+    return BulkJobResponse(**job)
+
+@app.get("/api/admin/jobs/{job_id}", response_model=BulkJobResponse)
+def get_bulk_job(
+    job_id: str,
+    current_user: dict = Depends(require_admin),
+    repo: Repository = Depends(get_repository)
+):
+    try:
+        job = repo.get_bulk_job(str(uuid.UUID(job_id)))
+    except ValueError:
+        job = None
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return BulkJobResponse(**job)
+
 # Admin Reporting Endpoints
 @app.get("/api/admin/reports/reservations")
-async def get_reservation_report(
+def get_reservation_report(
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
     current_user: dict = Depends(require_admin),
-    db: Session = Depends(get_db)
+    repo: Repository = Depends(get_report_repository)
 ):
-    query = """
-        SELECT * FROM reservation_summary
-        WHERE 1=1
-    """
-    params = {}
-    
-    if start_date:
-        query += " AND show_date >= :start_date"
-        params["start_date"] = start_date
-    
-    if end_date:
-        query += " AND show_date <= :end_date"
-        params["end_date"] = end_date
-    
-    query += " ORDER BY show_date, show_time"
-    
-    results = db.execute(text(query), params).fetchall()
-    
-    return [
-        {
-            "showtime_id": str(row[0]),
-            "movie_title": row[1],
-            "show_date": row[2],
-            "show_time": row[3],
-            "theater_name": row[4],
-            "total_reservations": row[5],
-            "seats_booked": row[6],
-            "seats_available": row[7],
-            "total_revenue": float(row[8]) if row[8] else 0.0
-        }
-        for row in results
-    ]
+    return repo.reservation_report(start_date, end_date)
 
 @app.get("/api/admin/reports/summary")
-async def get_summary_report(
+def get_summary_report(
     current_user: dict = Depends(require_admin),
-    db: Session = Depends(get_db)
+    repo: Repository = Depends(get_report_repository)
 ):
-    result = db.execute(
-        text("""
-            SELECT 
-                COUNT(DISTINCT r.id) as total_reservations,
-                SUM(r.total_price) as total_revenue,
-                COUNT(DISTINCT r.user_id) as total_customers,
-                COUNT(DISTINCT rs.seat_id) as total_seats_booked
-            FROM reservations r
-            LEFT JOIN reservation_seats rs ON r.id = rs.reservation_id
-            WHERE r.status = 'confirmed'
-        """)
-    ).fetchone()
-    
-    return {
-        "total_reservations": result[0] or 0,
-        "total_revenue": float(result[1]) if result[1] else 0.0,
-        "total_customers": result[2] or 0,
-        "total_seats_booked": result[3] or 0
-    }
+    return repo.summary_report()
+
+# Seat Demand Analytics
+# Results are cached per theater and date range for the rest of the day;
+# entries from earlier days are dropped as new ones come in, and beyond
+# DEMAND_CACHE_SIZE ranges the oldest entries go first
+DEMAND_CACHE_SIZE = int(os.getenv("DEMAND_CACHE_SIZE", "256"))
+
+demand_cache = {}
+
+@app.get("/api/admin/analytics/theaters/{theater_id}/demand")
+def get_seat_demand(
+    theater_id: str,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    current_user: dict = Depends(require_admin),
+    repo: Repository = Depends(get_report_repository)
+):
+    """Seat and time-slot fill heatmaps, sell-out curve and seat-type demand for a theater"""
+    today = date.today()
+    end_date = end_date or today
+    start_date = start_date or end_date - timedelta(days=365)
+    if end_date < start_date:
+        raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+
+    try:
+        theater_id = str(uuid.UUID(theater_id))
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Theater not found")
+
+    key = (theater_id, start_date, end_date, today)
+    demand = demand_cache.get(key)
+    if demand is None:
+        occupancy = repo.load_occupancy(theater_id, start_date, end_date)
+        if occupancy is None:
+            raise HTTPException(status_code=404, detail="Theater not found")
+
+        demand = {
+            "theater_id": theater_id,
+            "start_date": start_date,
+            "end_date": end_date,
+            "computed_at": datetime.utcnow(),
+            **seat_demand(occupancy)
+        }
+        # Other threads may be updating the cache too: iterate over a copy of
+        # the keys and tolerate entries they already removed
+        cached = list(demand_cache)
+        for stale in [cached_key for cached_key in cached if cached_key[3] != today]:
+            demand_cache.pop(stale, None)
+        for oldest in cached[:len(cached) - DEMAND_CACHE_SIZE + 1]:
+            demand_cache.pop(oldest, None)
+        demand_cache[key] = demand
+
+    return demand
 
 # Theaters Endpoint
 @app.get("/api/theaters")
-async def get_theaters(db: Session = Depends(get_db)):
-    results = db.execute(
-        text("SELECT id, name, total_seats FROM theaters")
-    ).fetchall()
-    
-    return [
-        {
-            "id": str(row[0]),
-            "name": row[1],
-            "total_seats": row[2]
-        }
-        for row in results
-    ]
+def get_theaters(repo: Repository = Depends(get_repository)):
+    return get_catalog(repo)["theaters"]
+
+# Health Endpoints
+@app.get("/healthz")
+async def healthz():
+    """Liveness: the process is up and serving"""
+    return {"status": "ok"}
+
+@app.get("/readyz")
+def readyz(response: Response):
+    """Readiness: warmed up and the database answers"""
+    try:
+        if not getattr(app.state, "ready", False):
+            warm_up()
+        with open_repository() as repo:
+            repo.ping()
+    except Exception as e:
+        response.status_code = 503
+        return {"status": "unavailable", "detail": str(e)}
+    return {"status": "ready"}
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,89 @@
+"""
+Versioned schema migrations for the Movie Reservation API.
+
+Migrations are plain SQL files in ./migrations named NNN_description.sql.
+Each one runs in its own transaction and is recorded in schema_migrations.
+
+Usage:
+    python migrate.py            # apply pending migrations
+    python migrate.py --status   # show applied and pending migrations
+"""
+
+import argparse
+import os
+from typing import List
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+
+
+def list_migrations() -> List[str]:
+    return sorted(
+        name for name in os.listdir(MIGRATIONS_DIR)
+        if name.endswith(".sql") and name[:3].isdigit()
+    )
+
+
+def applied_migrations(engine: Engine) -> List[str]:
+    with engine.begin() as conn:
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version VARCHAR(255) PRIMARY KEY,
+                applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+        """))
+        rows = conn.execute(text("SELECT version FROM schema_migrations")).fetchall()
+    return sorted(row[0] for row in rows)
+
+
+def apply_migrations(engine: Engine) -> List[str]:
+    """Apply every pending migration in order, returning the ones applied"""
+    done = set(applied_migrations(engine))
+    applied = []
+
+    for name in list_migrations():
+        if name in done:
+            continue
+        with open(os.path.join(MIGRATIONS_DIR, name)) as f:
+            sql = f.read()
+        with engine.begin() as conn:
+            # Run on the raw cursor so psycopg2 doesn't treat % in the SQL as
+            # parameter placeholders
+            conn.connection.cursor().execute(sql)
+            conn.execute(
+                text("INSERT INTO schema_migrations (version) VALUES (:version)"),
+                {"version": name}
+            )
+        applied.append(name)
+
+    return applied
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply database migrations")
+    parser.add_argument("--status", action="store_true", help="list migrations without applying")
+    parser.add_argument("--database-url", help="defaults to the API's DATABASE_URL")
+    args = parser.parse_args()
+
+    if args.database_url:
+        engine = create_engine(args.database_url)
+    else:
+        from main import engine
+
+    if args.status:
+        done = set(applied_migrations(engine))
+        for name in list_migrations():
+            print(f"{'applied' if name in done else 'pending'}  {name}")
+        return
+
+    applied = apply_migrations(engine)
+    for name in applied:
+        print(f"applied  {name}")
+    if not applied:
+        print("Database is up to date")
+
+
+if __name__ == "__main__":
+    main()
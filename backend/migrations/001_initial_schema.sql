@@ -0,0 +1,98 @@
+-- Baseline schema assumed by main.py.
+-- Uses IF NOT EXISTS so it can be recorded against databases that were
+-- created by hand before migrations existed.
+
+CREATE TABLE IF NOT EXISTS users (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    email VARCHAR(255) NOT NULL UNIQUE,
+    password_hash VARCHAR(255) NOT NULL,
+    full_name VARCHAR(255) NOT NULL,
+    role VARCHAR(20) NOT NULL DEFAULT 'user' CHECK (role IN ('user', 'admin')),
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS movies (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    title VARCHAR(255) NOT NULL,
+    description TEXT,
+    poster_image VARCHAR(500),
+    genre VARCHAR(100) NOT NULL,
+    duration_minutes INTEGER NOT NULL,
+    release_date DATE,
+    rating VARCHAR(10),
+    is_active BOOLEAN NOT NULL DEFAULT true,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS theaters (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    name VARCHAR(255) NOT NULL,
+    total_seats INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS seats (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    theater_id UUID NOT NULL REFERENCES theaters(id),
+    row_label VARCHAR(5) NOT NULL,
+    seat_number INTEGER NOT NULL,
+    seat_type VARCHAR(20) NOT NULL DEFAULT 'standard'
+        CHECK (seat_type IN ('standard', 'premium', 'vip')),
+    UNIQUE (theater_id, row_label, seat_number)
+);
+
+CREATE TABLE IF NOT EXISTS showtimes (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    movie_id UUID NOT NULL REFERENCES movies(id),
+    theater_id UUID NOT NULL REFERENCES theaters(id),
+    show_date DATE NOT NULL,
+    show_time TIME NOT NULL,
+    price NUMERIC(10, 2) NOT NULL,
+    is_active BOOLEAN NOT NULL DEFAULT true,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (theater_id, show_date, show_time)
+);
+
+CREATE TABLE IF NOT EXISTS reservations (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    user_id UUID NOT NULL REFERENCES users(id),
+    showtime_id UUID NOT NULL REFERENCES showtimes(id),
+    total_price NUMERIC(10, 2) NOT NULL,
+    booking_reference VARCHAR(20) NOT NULL UNIQUE,
+    status VARCHAR(20) NOT NULL DEFAULT 'confirmed'
+        CHECK (status IN ('confirmed', 'cancelled')),
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    cancelled_at TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS reservation_seats (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    reservation_id UUID NOT NULL REFERENCES reservations(id) ON DELETE CASCADE,
+    showtime_id UUID NOT NULL REFERENCES showtimes(id),
+    seat_id UUID NOT NULL REFERENCES seats(id)
+);
+
+CREATE OR REPLACE VIEW reservation_summary AS
+SELECT
+    s.id AS showtime_id,
+    m.title AS movie_title,
+    s.show_date,
+    s.show_time,
+    t.name AS theater_name,
+    rv.total_reservations,
+    sb.seats_booked,
+    t.total_seats - sb.seats_booked AS seats_available,
+    rv.total_revenue
+FROM showtimes s
+JOIN movies m ON s.movie_id = m.id
+JOIN theaters t ON s.theater_id = t.id
+CROSS JOIN LATERAL (
+    SELECT COUNT(*) AS total_reservations, SUM(r.total_price) AS total_revenue
+    FROM reservations r
+    WHERE r.showtime_id = s.id AND r.status = 'confirmed'
+) rv
+CROSS JOIN LATERAL (
+    SELECT COUNT(*) AS seats_booked
+    FROM reservation_seats rs
+    JOIN reservations r ON rs.reservation_id = r.id AND r.status = 'confirmed'
+    WHERE rs.showtime_id = s.id
+) sb;
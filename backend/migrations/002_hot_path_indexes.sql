@@ -0,0 +1,36 @@
+-- Indexes for the predicates used by the API hot paths.
+
+-- Seat map / availability: confirmed seats for one showtime.
+CREATE INDEX IF NOT EXISTS idx_reservation_seats_showtime_seat
+    ON reservation_seats (showtime_id, seat_id) INCLUDE (reservation_id);
+
+-- Seat lists for a user's reservations and the summary report join.
+CREATE INDEX IF NOT EXISTS idx_reservation_seats_reservation
+    ON reservation_seats (reservation_id);
+
+-- "My reservations", newest first.
+CREATE INDEX IF NOT EXISTS idx_reservations_user_created
+    ON reservations (user_id, created_at DESC);
+
+-- Confirmed reservations per showtime (availability counts, reports).
+CREATE INDEX IF NOT EXISTS idx_reservations_showtime_confirmed
+    ON reservations (showtime_id) INCLUDE (total_price)
+    WHERE status = 'confirmed';
+
+-- Showtime listings by date and by movie.
+CREATE INDEX IF NOT EXISTS idx_showtimes_active_date_time
+    ON showtimes (show_date, show_time)
+    WHERE is_active;
+
+CREATE INDEX IF NOT EXISTS idx_showtimes_active_movie_date_time
+    ON showtimes (movie_id, show_date, show_time)
+    WHERE is_active;
+
+-- Admin reports filter by date regardless of is_active.
+CREATE INDEX IF NOT EXISTS idx_showtimes_show_date
+    ON showtimes (show_date);
+
+-- Movie catalog.
+CREATE INDEX IF NOT EXISTS idx_movies_active_release_date
+    ON movies (release_date DESC)
+    WHERE is_active;
@@ -0,0 +1,155 @@
+-- Range-partition reservations and reservation_seats by the showtime's date.
+--
+-- Both tables carry show_date so queries that pin it (or join on it) only
+-- touch the matching monthly partitions. Partitions for past months are moved
+-- to the archive schema by archive_partitions.py; the *_all views read across
+-- hot and archived data for history and reports.
+
+DROP VIEW IF EXISTS reservation_summary;
+
+ALTER TABLE reservation_seats RENAME TO reservation_seats_legacy;
+ALTER TABLE reservations RENAME TO reservations_legacy;
+
+CREATE TABLE reservations (
+    id UUID NOT NULL DEFAULT gen_random_uuid(),
+    user_id UUID NOT NULL REFERENCES users(id),
+    showtime_id UUID NOT NULL REFERENCES showtimes(id),
+    show_date DATE NOT NULL,
+    total_price NUMERIC(10, 2) NOT NULL,
+    booking_reference VARCHAR(20) NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'confirmed'
+        CHECK (status IN ('confirmed', 'cancelled')),
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    cancelled_at TIMESTAMP,
+    PRIMARY KEY (id, show_date)
+) PARTITION BY RANGE (show_date);
+
+CREATE TABLE reservation_seats (
+    id UUID NOT NULL DEFAULT gen_random_uuid(),
+    reservation_id UUID NOT NULL,
+    showtime_id UUID NOT NULL REFERENCES showtimes(id),
+    show_date DATE NOT NULL,
+    seat_id UUID NOT NULL REFERENCES seats(id),
+    PRIMARY KEY (id, show_date)
+) PARTITION BY RANGE (show_date);
+
+CREATE SCHEMA IF NOT EXISTS archive;
+
+CREATE TABLE archive.reservations (LIKE reservations INCLUDING DEFAULTS INCLUDING CONSTRAINTS)
+    PARTITION BY RANGE (show_date);
+CREATE TABLE archive.reservation_seats (LIKE reservation_seats INCLUDING DEFAULTS INCLUDING CONSTRAINTS)
+    PARTITION BY RANGE (show_date);
+
+-- Creates the monthly partitions covering [from_date, to_date]. Called by
+-- create_showtime for the showtime's date and by the archival job.
+CREATE OR REPLACE FUNCTION create_reservation_partitions(from_date DATE, to_date DATE)
+RETURNS void AS $$
+DECLARE
+    month_start DATE := date_trunc('month', from_date)::date;
+    month_end DATE;
+BEGIN
+    WHILE month_start <= to_date LOOP
+        month_end := (month_start + INTERVAL '1 month')::date;
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF reservations FOR VALUES FROM (%L) TO (%L)',
+            'reservations_p' || to_char(month_start, 'YYYYMM'), month_start, month_end
+        );
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF reservation_seats FOR VALUES FROM (%L) TO (%L)',
+            'reservation_seats_p' || to_char(month_start, 'YYYYMM'), month_start, month_end
+        );
+        month_start := month_end;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT create_reservation_partitions(
+    LEAST(
+        (SELECT MIN(show_date) FROM showtimes),
+        CURRENT_DATE
+    ),
+    GREATEST(
+        (SELECT MAX(show_date) FROM showtimes),
+        (CURRENT_DATE + INTERVAL '12 months')::date
+    )
+);
+
+INSERT INTO reservations
+    (id, user_id, showtime_id, show_date, total_price, booking_reference,
+     status, created_at, cancelled_at)
+SELECT r.id, r.user_id, r.showtime_id, s.show_date, r.total_price,
+       r.booking_reference, r.status, r.created_at, r.cancelled_at
+FROM reservations_legacy r
+JOIN showtimes s ON r.showtime_id = s.id;
+
+INSERT INTO reservation_seats (id, reservation_id, showtime_id, show_date, seat_id)
+SELECT rs.id, rs.reservation_id, rs.showtime_id, s.show_date, rs.seat_id
+FROM reservation_seats_legacy rs
+JOIN showtimes s ON rs.showtime_id = s.id;
+
+DROP TABLE reservation_seats_legacy;
+DROP TABLE reservations_legacy;
+
+-- Indexes from 002, now per partition. Defined on both parents so archived
+-- partitions keep them when they are attached to the archive tables.
+CREATE INDEX idx_reservation_seats_showtime_seat
+    ON reservation_seats (showtime_id, seat_id) INCLUDE (reservation_id);
+CREATE INDEX idx_reservation_seats_reservation
+    ON reservation_seats (reservation_id);
+CREATE INDEX idx_reservations_user_created
+    ON reservations (user_id, created_at DESC);
+CREATE INDEX idx_reservations_showtime_confirmed
+    ON reservations (showtime_id) INCLUDE (total_price)
+    WHERE status = 'confirmed';
+CREATE INDEX idx_reservations_booking_reference
+    ON reservations (booking_reference);
+
+CREATE INDEX idx_archive_reservation_seats_showtime_seat
+    ON archive.reservation_seats (showtime_id, seat_id) INCLUDE (reservation_id);
+CREATE INDEX idx_archive_reservation_seats_reservation
+    ON archive.reservation_seats (reservation_id);
+CREATE INDEX idx_archive_reservations_user_created
+    ON archive.reservations (user_id, created_at DESC);
+CREATE INDEX idx_archive_reservations_showtime_confirmed
+    ON archive.reservations (showtime_id) INCLUDE (total_price)
+    WHERE status = 'confirmed';
+CREATE INDEX idx_archive_reservations_booking_reference
+    ON archive.reservations (booking_reference);
+
+CREATE VIEW reservations_all AS
+SELECT * FROM reservations
+UNION ALL
+SELECT * FROM archive.reservations;
+
+CREATE VIEW reservation_seats_all AS
+SELECT * FROM reservation_seats
+UNION ALL
+SELECT * FROM archive.reservation_seats;
+
+CREATE VIEW reservation_summary AS
+SELECT
+    s.id AS showtime_id,
+    m.title AS movie_title,
+    s.show_date,
+    s.show_time,
+    t.name AS theater_name,
+    rv.total_reservations,
+    sb.seats_booked,
+    t.total_seats - sb.seats_booked AS seats_available,
+    rv.total_revenue
+FROM showtimes s
+JOIN movies m ON s.movie_id = m.id
+JOIN theaters t ON s.theater_id = t.id
+CROSS JOIN LATERAL (
+    SELECT COUNT(*) AS total_reservations, SUM(r.total_price) AS total_revenue
+    FROM reservations_all r
+    WHERE r.showtime_id = s.id AND r.show_date = s.show_date
+    AND r.status = 'confirmed'
+) rv
+CROSS JOIN LATERAL (
+    SELECT COUNT(*) AS seats_booked
+    FROM reservation_seats_all rs
+    JOIN reservations_all r ON rs.reservation_id = r.id
+        AND r.show_date = rs.show_date AND r.status = 'confirmed'
+    WHERE rs.showtime_id = s.id AND rs.show_date = s.show_date
+) sb;
@@ -0,0 +1,37 @@
+-- Version counters used as ETags by GET /api/showtimes/{id}.
+--
+-- showtimes.version changes whenever the showtime row changes or one of its
+-- reservations is created or changes status; movies.version whenever the
+-- movie is edited. Checking a cached response then only needs two primary
+-- key lookups.
+
+ALTER TABLE showtimes ADD COLUMN version BIGINT NOT NULL DEFAULT 1;
+ALTER TABLE movies ADD COLUMN version BIGINT NOT NULL DEFAULT 1;
+
+CREATE OR REPLACE FUNCTION bump_row_version() RETURNS trigger AS $$
+BEGIN
+    IF NEW.version = OLD.version THEN
+        NEW.version := OLD.version + 1;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER showtimes_bump_version
+    BEFORE UPDATE ON showtimes
+    FOR EACH ROW EXECUTE FUNCTION bump_row_version();
+
+CREATE TRIGGER movies_bump_version
+    BEFORE UPDATE ON movies
+    FOR EACH ROW EXECUTE FUNCTION bump_row_version();
+
+CREATE OR REPLACE FUNCTION bump_showtime_version() RETURNS trigger AS $$
+BEGIN
+    UPDATE showtimes SET version = version + 1 WHERE id = NEW.showtime_id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER reservations_bump_showtime_version
+    AFTER INSERT OR UPDATE OF status ON reservations
+    FOR EACH ROW EXECUTE FUNCTION bump_showtime_version();
@@ -0,0 +1,26 @@
+-- Bump each affected showtime's version once per statement instead of once
+-- per reservation row, so set-based inserts (cart checkout) and bulk
+-- cancellations touch every showtime row a single time.
+
+DROP TRIGGER reservations_bump_showtime_version ON reservations;
+DROP FUNCTION bump_showtime_version();
+
+CREATE OR REPLACE FUNCTION bump_showtime_versions() RETURNS trigger AS $$
+BEGIN
+    UPDATE showtimes SET version = version + 1
+    WHERE id IN (SELECT DISTINCT showtime_id FROM changed_reservations);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Transition tables can't be combined with a column list, so updates bump
+-- the version whatever column changed.
+CREATE TRIGGER reservations_insert_bump_showtime_versions
+    AFTER INSERT ON reservations
+    REFERENCING NEW TABLE AS changed_reservations
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_showtime_versions();
+
+CREATE TRIGGER reservations_update_bump_showtime_versions
+    AFTER UPDATE ON reservations
+    REFERENCING NEW TABLE AS changed_reservations
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_showtime_versions();
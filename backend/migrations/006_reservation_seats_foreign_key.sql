@@ -0,0 +1,24 @@
+-- Restore the reservation_seats -> reservations foreign key that 003 lost when
+-- it rebuilt both tables as partitioned tables.
+--
+-- The key includes show_date, the partition key, so each seat row must point
+-- at a reservation of the same date and seat partitions always pair with the
+-- reservation partition of the same month. The archive tables get the same
+-- key (and the primary key it needs, which LIKE did not copy);
+-- archive_partitions.py moves a month's seats after its reservations are in
+-- place on the archive side.
+
+ALTER TABLE reservation_seats
+    ADD CONSTRAINT reservation_seats_reservation_fkey
+    FOREIGN KEY (reservation_id, show_date)
+    REFERENCES reservations (id, show_date)
+    ON DELETE CASCADE;
+
+ALTER TABLE archive.reservations ADD PRIMARY KEY (id, show_date);
+ALTER TABLE archive.reservation_seats ADD PRIMARY KEY (id, show_date);
+
+ALTER TABLE archive.reservation_seats
+    ADD CONSTRAINT archive_reservation_seats_reservation_fkey
+    FOREIGN KEY (reservation_id, show_date)
+    REFERENCES archive.reservations (id, show_date)
+    ON DELETE CASCADE;
@@ -0,0 +1,21 @@
+-- Progress of the admin bulk jobs (showtime cancellation, movie deactivation,
+-- repricing), written after every chunk so any API worker can report it.
+--
+-- A job whose worker died stays 'running'; updated_at shows when it last made
+-- progress, and the operation itself can simply be started again.
+
+CREATE TABLE bulk_jobs (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    kind VARCHAR(50) NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'running'
+        CHECK (status IN ('running', 'completed', 'failed')),
+    unit VARCHAR(20) NOT NULL,
+    total INTEGER NOT NULL,
+    processed INTEGER NOT NULL DEFAULT 0,
+    reservations_cancelled INTEGER NOT NULL DEFAULT 0,
+    refunded_amount NUMERIC(12, 2) NOT NULL DEFAULT 0,
+    error TEXT,
+    started_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    finished_at TIMESTAMP
+);
@@ -0,0 +1,13 @@
+from .base import ConflictError, DeadlineExceededError, NotFoundError, Repository, RepositoryError
+from .memory import MemoryRepository
+from .postgres import PostgresRepository
+
+__all__ = [
+    "ConflictError",
+    "DeadlineExceededError",
+    "MemoryRepository",
+    "NotFoundError",
+    "PostgresRepository",
+    "Repository",
+    "RepositoryError",
+]
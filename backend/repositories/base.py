@@ -0,0 +1,205 @@
+"""
+Storage interface used by the API handlers.
+
+Every method is one unit of work: writes are committed (or rolled back)
+before the method returns. Records are plain dicts whose keys match the
+API's response models.
+"""
+
+import random
+import string
+from abc import ABC, abstractmethod
+from datetime import date
+from typing import Dict, List, Optional, Set, Tuple
+
+
+class RepositoryError(Exception):
+    """Base class for storage errors the API turns into HTTP responses"""
+
+    def __init__(self, detail: str):
+        super().__init__(detail)
+        self.detail = detail
+
+
+class NotFoundError(RepositoryError):
+    pass
+
+
+class ConflictError(RepositoryError):
+    pass
+
+
+class DeadlineExceededError(RepositoryError):
+    """The request's time budget ran out before a statement could start"""
+
+
+def generate_booking_reference() -> str:
+    return ''.join(random.choices(string.ascii_uppercase + string.digits, k=10))
+
+
+class Repository(ABC):
+    # Health
+    @abstractmethod
+    def ping(self):
+        """Raise if the storage can't serve requests"""
+
+    @abstractmethod
+    def warm_up(self):
+        """Run the hot read statements once so the first real requests find warm caches"""
+
+    # Users
+    @abstractmethod
+    def get_user(self, user_id: str) -> Optional[dict]:
+        """id, email, full_name, role"""
+
+    @abstractmethod
+    def get_user_by_email(self, email: str) -> Optional[dict]:
+        """Like get_user, plus password_hash"""
+
+    @abstractmethod
+    def create_user(self, email: str, password_hash: str, full_name: str) -> dict:
+        """Raises ConflictError if the email is taken"""
+
+    # Movies
+    @abstractmethod
+    def list_movies(self, genre: Optional[str] = None) -> List[dict]:
+        """Active movies, newest release first"""
+
+    @abstractmethod
+    def get_movie(self, movie_id: str) -> Optional[dict]:
+        pass
+
+    @abstractmethod
+    def create_movie(self, movie: dict) -> dict:
+        pass
+
+    @abstractmethod
+    def update_movie(self, movie_id: str, movie: dict) -> Optional[dict]:
+        pass
+
+    @abstractmethod
+    def deactivate_movie(self, movie_id: str) -> bool:
+        pass
+
+    # Theaters
+    @abstractmethod
+    def list_theaters(self) -> List[dict]:
+        pass
+
+    @abstractmethod
+    def get_seat_layouts(self) -> Dict[str, List[dict]]:
+        """Every theater's seats, ordered by row and number, keyed by theater id"""
+
+    # Showtimes
+    @abstractmethod
+    def list_showtimes(self, movie_id: Optional[str] = None,
+                       show_date: Optional[date] = None) -> List[dict]:
+        """Active showtimes with movie_title, theater_name and available_seats"""
+
+    @abstractmethod
+    def create_showtime(self, showtime: dict) -> dict:
+        """Raises ConflictError if the theater already has a show at that time"""
+
+    @abstractmethod
+    def get_booked_seats(self, showtime_id: str) -> Optional[Tuple[str, Set[str]]]:
+        """(theater id, ids of confirmed seats) for a showtime"""
+
+    @abstractmethod
+    def get_showtime_versions(self, showtime_id: str) -> Optional[Tuple[int, int]]:
+        """(showtime version, movie version), bumped on every change"""
+
+    @abstractmethod
+    def get_showtime_detail(self, showtime_id: str) -> Optional[dict]:
+        """Showtime with movie, total_seats, seats and both versions"""
+
+    # Reservations
+    @abstractmethod
+    def reserve_seats(self, user_id: str, seats_by_showtime: Dict[str, List[str]]) -> List[dict]:
+        """
+        Book the given seats for every showtime atomically, returning one
+        reservation per showtime in request order. Raises NotFoundError for
+        an unknown or inactive showtime and ConflictError if any seat is taken
+        or not in the showtime's theater.
+        """
+
+    @abstractmethod
+    def list_user_reservations(self, user_id: str) -> List[dict]:
+        """All of a user's reservations, hot and archived, newest first"""
+
+    @abstractmethod
+    def get_confirmed_reservation(self, user_id: str, reservation_id: str) -> Optional[dict]:
+        """id, show_date and show_time of a user's confirmed reservation"""
+
+    @abstractmethod
+    def cancel_reservation(self, reservation_id: str, show_date: date):
+        """Does nothing if the reservation is no longer confirmed"""
+
+    # Bulk admin operations, each call handling at most chunk_size rows
+    @abstractmethod
+    def create_bulk_job(self, kind: str, unit: str, total: int) -> dict:
+        """A new running job with no progress yet"""
+
+    @abstractmethod
+    def save_bulk_job(self, job: dict):
+        """Store a job's status, progress and error; finished_at is set once it stops running"""
+
+    @abstractmethod
+    def get_bulk_job(self, job_id: str) -> Optional[dict]:
+        pass
+
+    @abstractmethod
+    def deactivate_showtime(self, showtime_id: str) -> Optional[date]:
+        """Returns the showtime's date, or None if it doesn't exist"""
+
+    @abstractmethod
+    def count_confirmed_reservations(self, showtime_id: str, show_date: date) -> int:
+        pass
+
+    @abstractmethod
+    def cancel_reservations_chunk(self, showtime_id: str, show_date: date,
+                                  chunk_size: int) -> List[float]:
+        """Cancel up to chunk_size confirmed reservations, returning their prices"""
+
+    @abstractmethod
+    def count_upcoming_showtimes(self, movie_id: str) -> int:
+        pass
+
+    @abstractmethod
+    def deactivate_upcoming_showtimes_chunk(self, movie_id: str,
+                                            chunk_size: int) -> List[Tuple[str, date]]:
+        """
+        Deactivate up to chunk_size upcoming showtimes, returning (id,
+        show_date). Inactive ones that still have confirmed reservations are
+        returned again, so an interrupted job can be rerun.
+        """
+
+    @abstractmethod
+    def count_showtimes_to_reprice(self, filters: dict) -> int:
+        """filters: start_date, end_date, price and optional movie_id, theater_id"""
+
+    @abstractmethod
+    def reprice_showtimes_chunk(self, filters: dict, after_id: str, chunk_size: int) -> List[str]:
+        """Reprice up to chunk_size showtimes with ids above after_id, returning their ids in order"""
+
+    # Analytics
+    @abstractmethod
+    def load_occupancy(self, theater_id: str, start_date: date,
+                       end_date: date) -> Optional[dict]:
+        """
+        Confirmed bookings of a theater's active showtimes in a date range,
+        or None for an unknown theater. Returns the seats (row_label,
+        seat_number, seat_type) and showtimes (id, show_date, show_time) in
+        a fixed order, plus one entry per booked seat in three parallel
+        lists: showtime_index and seat_index into those, and lead_hours, how
+        long before the show it was booked.
+        """
+
+    # Reports
+    @abstractmethod
+    def reservation_report(self, start_date: Optional[date] = None,
+                           end_date: Optional[date] = None) -> List[dict]:
+        pass
+
+    @abstractmethod
+    def summary_report(self) -> dict:
+        pass
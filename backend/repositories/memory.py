@@ -0,0 +1,536 @@
+"""
+In-process storage for tests and micro-benchmarks.
+
+Everything lives in indexed dicts guarded by one lock. Each showtime keeps
+its booked seats as a bitmap (a Python int, one bit per seat position in
+the theater), so availability checks and bookings are a few integer ops.
+It enforces the same rules as the database: unique emails and show slots,
+seats must belong to the showtime's theater, and a checkout books every
+seat or none.
+"""
+
+import threading
+import uuid
+from datetime import date, datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from .base import ConflictError, NotFoundError, Repository, generate_booking_reference
+
+MOVIE_FIELDS = (
+    "id", "title", "description", "poster_image", "genre",
+    "duration_minutes", "release_date", "rating", "is_active"
+)
+SHOWTIME_FIELDS = ("id", "movie_id", "theater_id", "show_date", "show_time", "price", "is_active")
+SEAT_FIELDS = ("id", "row_label", "seat_number", "seat_type")
+
+
+def pick(record: dict, fields: tuple) -> dict:
+    return {field: record[field] for field in fields}
+
+
+def popcount(bitmap: int) -> int:
+    return bin(bitmap).count("1")
+
+
+class MemoryRepository(Repository):
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.users = {}
+        self.users_by_email = {}
+        self.movies = {}
+        self.theaters = {}
+        # theater id -> seats ordered by row and number; a seat's position in
+        # that list is its bit in the showtime bitmaps
+        self.theater_seats = {}
+        self.seat_positions = {}
+        self.showtimes = {}
+        self.show_slots = set()
+        self.booked = {}
+        self.reservations = {}
+        self.reservations_by_user = {}
+        self.reservations_by_showtime = {}
+        self.bulk_jobs = {}
+
+    # Seeding
+    def add_user(self, email: str, password_hash: str, full_name: str, role: str = "user") -> dict:
+        user = self.create_user(email, password_hash, full_name)
+        with self.lock:
+            self.users[user["id"]]["role"] = role
+        return {**user, "role": role}
+
+    def add_theater(self, name: str, rows: int, seats_per_row: int,
+                    seat_types: Optional[Dict[str, str]] = None) -> dict:
+        """Add a theater with rows A, B, ... of numbered seats; seat_types maps row label to type"""
+        seat_types = seat_types or {}
+        with self.lock:
+            theater = {"id": str(uuid.uuid4()), "name": name, "total_seats": rows * seats_per_row}
+            seats = [
+                {
+                    "id": str(uuid.uuid4()),
+                    "row_label": chr(65 + row),
+                    "seat_number": number,
+                    "seat_type": seat_types.get(chr(65 + row), "standard")
+                }
+                for row in range(rows)
+                for number in range(1, seats_per_row + 1)
+            ]
+            self.theaters[theater["id"]] = theater
+            self.theater_seats[theater["id"]] = seats
+            for position, seat in enumerate(seats):
+                self.seat_positions[seat["id"]] = (theater["id"], position)
+            return dict(theater)
+
+    def _bump_showtime(self, showtime_id: str):
+        self.showtimes[showtime_id]["version"] += 1
+
+    # Health
+    def ping(self):
+        pass
+
+    def warm_up(self):
+        pass
+
+    # Users
+    def get_user(self, user_id: str) -> Optional[dict]:
+        with self.lock:
+            user = self.users.get(user_id)
+            return pick(user, ("id", "email", "full_name", "role")) if user else None
+
+    def get_user_by_email(self, email: str) -> Optional[dict]:
+        with self.lock:
+            user_id = self.users_by_email.get(email)
+            return dict(self.users[user_id]) if user_id else None
+
+    def create_user(self, email: str, password_hash: str, full_name: str) -> dict:
+        with self.lock:
+            if email in self.users_by_email:
+                raise ConflictError("Email already registered")
+            user = {
+                "id": str(uuid.uuid4()),
+                "email": email,
+                "password_hash": password_hash,
+                "full_name": full_name,
+                "role": "user"
+            }
+            self.users[user["id"]] = user
+            self.users_by_email[email] = user["id"]
+            return pick(user, ("id", "email", "full_name", "role"))
+
+    # Movies
+    def list_movies(self, genre: Optional[str] = None) -> List[dict]:
+        with self.lock:
+            movies = [
+                pick(movie, MOVIE_FIELDS) for movie in self.movies.values()
+                if movie["is_active"] and (not genre or movie["genre"] == genre)
+            ]
+        # Postgres sorts NULLs first in descending order
+        return sorted(
+            movies,
+            key=lambda movie: (movie["release_date"] is not None, movie["release_date"] or date.min),
+            reverse=True
+        )
+
+    def get_movie(self, movie_id: str) -> Optional[dict]:
+        with self.lock:
+            movie = self.movies.get(movie_id)
+            return pick(movie, MOVIE_FIELDS) if movie else None
+
+    def create_movie(self, movie: dict) -> dict:
+        with self.lock:
+            record = {**movie, "id": str(uuid.uuid4()), "is_active": True, "version": 1}
+            self.movies[record["id"]] = record
+            return pick(record, MOVIE_FIELDS)
+
+    def update_movie(self, movie_id: str, movie: dict) -> Optional[dict]:
+        with self.lock:
+            record = self.movies.get(movie_id)
+            if not record:
+                return None
+            record.update(movie)
+            record["version"] += 1
+            return pick(record, MOVIE_FIELDS)
+
+    def deactivate_movie(self, movie_id: str) -> bool:
+        with self.lock:
+            record = self.movies.get(movie_id)
+            if not record:
+                return False
+            record["is_active"] = False
+            record["version"] += 1
+            return True
+
+    # Theaters
+    def list_theaters(self) -> List[dict]:
+        with self.lock:
+            return [dict(theater) for theater in self.theaters.values()]
+
+    def get_seat_layouts(self) -> Dict[str, List[dict]]:
+        with self.lock:
+            return {
+                theater_id: [dict(seat) for seat in seats]
+                for theater_id, seats in self.theater_seats.items()
+            }
+
+    # Showtimes
+    def _showtime_summary(self, showtime: dict) -> dict:
+        theater = self.theaters[showtime["theater_id"]]
+        return {
+            **pick(showtime, SHOWTIME_FIELDS),
+            "movie_title": self.movies[showtime["movie_id"]]["title"],
+            "theater_name": theater["name"],
+            "available_seats": theater["total_seats"] - popcount(self.booked[showtime["id"]])
+        }
+
+    def list_showtimes(self, movie_id: Optional[str] = None,
+                       show_date: Optional[date] = None) -> List[dict]:
+        with self.lock:
+            showtimes = [
+                self._showtime_summary(showtime) for showtime in self.showtimes.values()
+                if showtime["is_active"]
+                and (not movie_id or showtime["movie_id"] == movie_id)
+                and (not show_date or showtime["show_date"] == show_date)
+            ]
+        return sorted(showtimes, key=lambda showtime: (showtime["show_date"], showtime["show_time"]))
+
+    def create_showtime(self, showtime: dict) -> dict:
+        with self.lock:
+            if showtime["movie_id"] not in self.movies or showtime["theater_id"] not in self.theaters:
+                raise ConflictError("Theater already has a show at this time")
+            slot = (showtime["theater_id"], showtime["show_date"], showtime["show_time"])
+            if slot in self.show_slots:
+                raise ConflictError("Theater already has a show at this time")
+            record = {**showtime, "id": str(uuid.uuid4()), "is_active": True, "version": 1}
+            self.showtimes[record["id"]] = record
+            self.show_slots.add(slot)
+            self.booked[record["id"]] = 0
+            self.reservations_by_showtime[record["id"]] = []
+            return pick(record, SHOWTIME_FIELDS)
+
+    def _seat_map(self, showtime: dict) -> List[dict]:
+        booked = self.booked[showtime["id"]]
+        return [
+            {**seat, "is_available": not booked >> position & 1}
+            for position, seat in enumerate(self.theater_seats[showtime["theater_id"]])
+        ]
+
+    def get_booked_seats(self, showtime_id: str) -> Optional[Tuple[str, Set[str]]]:
+        with self.lock:
+            showtime = self.showtimes.get(showtime_id)
+            if not showtime:
+                return None
+            booked = self.booked[showtime_id]
+            seats = self.theater_seats[showtime["theater_id"]]
+            return showtime["theater_id"], {
+                seat["id"] for position, seat in enumerate(seats) if booked >> position & 1
+            }
+
+    def get_showtime_versions(self, showtime_id: str) -> Optional[Tuple[int, int]]:
+        with self.lock:
+            showtime = self.showtimes.get(showtime_id)
+            if not showtime:
+                return None
+            return showtime["version"], self.movies[showtime["movie_id"]]["version"]
+
+    def get_showtime_detail(self, showtime_id: str) -> Optional[dict]:
+        with self.lock:
+            showtime = self.showtimes.get(showtime_id)
+            if not showtime:
+                return None
+            movie = self.movies[showtime["movie_id"]]
+            return {
+                **self._showtime_summary(showtime),
+                "version": showtime["version"],
+                "movie_version": movie["version"],
+                "movie": pick(movie, MOVIE_FIELDS),
+                "total_seats": self.theaters[showtime["theater_id"]]["total_seats"],
+                "seats": self._seat_map(showtime)
+            }
+
+    # Reservations
+    def reserve_seats(self, user_id: str, seats_by_showtime: Dict[str, List[str]]) -> List[dict]:
+        with self.lock:
+            showtimes = {}
+            for showtime_id in seats_by_showtime:
+                showtime = self.showtimes.get(showtime_id)
+                if not showtime or not showtime["is_active"]:
+                    raise NotFoundError("Showtime not found")
+                showtimes[showtime_id] = showtime
+
+            # Check everything before booking anything
+            requested = {}
+            for showtime_id, seat_ids in seats_by_showtime.items():
+                theater_id = showtimes[showtime_id]["theater_id"]
+                bits = 0
+                for seat_id in seat_ids:
+                    seat_theater, position = self.seat_positions.get(seat_id, (None, 0))
+                    if seat_theater != theater_id:
+                        raise ConflictError("One or more seats are not available or do not exist")
+                    bits |= 1 << position
+                if bits & self.booked[showtime_id]:
+                    raise ConflictError("One or more seats are not available or do not exist")
+                requested[showtime_id] = bits
+
+            created_at = datetime.now()
+            reservations = []
+            for showtime_id, seat_ids in seats_by_showtime.items():
+                showtime = showtimes[showtime_id]
+                self.booked[showtime_id] |= requested[showtime_id]
+                reservation = {
+                    "id": str(uuid.uuid4()),
+                    "user_id": user_id,
+                    "showtime_id": showtime_id,
+                    "show_date": showtime["show_date"],
+                    "total_price": float(showtime["price"]) * len(seat_ids),
+                    "booking_reference": generate_booking_reference(),
+                    "status": "confirmed",
+                    "created_at": created_at,
+                    "seat_ids": list(seat_ids)
+                }
+                self.reservations[reservation["id"]] = reservation
+                self.reservations_by_user.setdefault(user_id, []).append(reservation)
+                self.reservations_by_showtime[showtime_id].append(reservation)
+                self._bump_showtime(showtime_id)
+                reservations.append(self._reservation_response(reservation))
+            return reservations
+
+    def _reservation_response(self, reservation: dict) -> dict:
+        showtime = self.showtimes[reservation["showtime_id"]]
+        theater_seats = self.theater_seats[showtime["theater_id"]]
+        return {
+            **pick(reservation, (
+                "id", "booking_reference", "showtime_id", "total_price", "status", "created_at"
+            )),
+            "movie_title": self.movies[showtime["movie_id"]]["title"],
+            "show_date": showtime["show_date"],
+            "show_time": showtime["show_time"],
+            "theater_name": self.theaters[showtime["theater_id"]]["name"],
+            "seats": [
+                pick(theater_seats[self.seat_positions[seat_id][1]], SEAT_FIELDS)
+                for seat_id in reservation["seat_ids"]
+            ]
+        }
+
+    def list_user_reservations(self, user_id: str) -> List[dict]:
+        with self.lock:
+            return [
+                self._reservation_response(reservation)
+                for reservation in reversed(self.reservations_by_user.get(user_id, []))
+            ]
+
+    def get_confirmed_reservation(self, user_id: str, reservation_id: str) -> Optional[dict]:
+        with self.lock:
+            reservation = self.reservations.get(reservation_id)
+            if not reservation or reservation["user_id"] != user_id or reservation["status"] != "confirmed":
+                return None
+            return {
+                "id": reservation_id,
+                "show_date": reservation["show_date"],
+                "show_time": self.showtimes[reservation["showtime_id"]]["show_time"]
+            }
+
+    def _cancel(self, reservation: dict) -> bool:
+        # The seats of a reservation cancelled earlier may have been booked
+        # again since, so they must not be freed twice
+        if reservation["status"] != "confirmed":
+            return False
+        showtime_id = reservation["showtime_id"]
+        for seat_id in reservation["seat_ids"]:
+            self.booked[showtime_id] &= ~(1 << self.seat_positions[seat_id][1])
+        reservation["status"] = "cancelled"
+        reservation["cancelled_at"] = datetime.now()
+        return True
+
+    def cancel_reservation(self, reservation_id: str, show_date: date):
+        with self.lock:
+            reservation = self.reservations.get(reservation_id)
+            if reservation and reservation["show_date"] == show_date and self._cancel(reservation):
+                self._bump_showtime(reservation["showtime_id"])
+
+    # Bulk admin operations
+    def create_bulk_job(self, kind: str, unit: str, total: int) -> dict:
+        now = datetime.now()
+        job = {
+            "id": str(uuid.uuid4()),
+            "kind": kind,
+            "status": "running",
+            "unit": unit,
+            "total": total,
+            "processed": 0,
+            "reservations_cancelled": 0,
+            "refunded_amount": 0.0,
+            "error": None,
+            "started_at": now,
+            "updated_at": now,
+            "finished_at": None
+        }
+        with self.lock:
+            self.bulk_jobs[job["id"]] = job
+            return dict(job)
+
+    def save_bulk_job(self, job: dict):
+        with self.lock:
+            stored = self.bulk_jobs.get(job["id"])
+            if stored:
+                now = datetime.now()
+                stored.update(
+                    pick(job, ("status", "processed", "reservations_cancelled", "refunded_amount", "error")),
+                    updated_at=now,
+                    finished_at=None if job["status"] == "running" else now
+                )
+
+    def get_bulk_job(self, job_id: str) -> Optional[dict]:
+        with self.lock:
+            job = self.bulk_jobs.get(job_id)
+            return dict(job) if job else None
+
+    def deactivate_showtime(self, showtime_id: str) -> Optional[date]:
+        with self.lock:
+            showtime = self.showtimes.get(showtime_id)
+            if not showtime:
+                return None
+            showtime["is_active"] = False
+            self._bump_showtime(showtime_id)
+            return showtime["show_date"]
+
+    def _confirmed(self, showtime_id: str) -> List[dict]:
+        return [
+            reservation for reservation in self.reservations_by_showtime.get(showtime_id, [])
+            if reservation["status"] == "confirmed"
+        ]
+
+    def count_confirmed_reservations(self, showtime_id: str, show_date: date) -> int:
+        with self.lock:
+            return len(self._confirmed(showtime_id))
+
+    def cancel_reservations_chunk(self, showtime_id: str, show_date: date,
+                                  chunk_size: int) -> List[float]:
+        with self.lock:
+            chunk = self._confirmed(showtime_id)[:chunk_size]
+            for reservation in chunk:
+                self._cancel(reservation)
+            if chunk:
+                self._bump_showtime(showtime_id)
+            return [reservation["total_price"] for reservation in chunk]
+
+    def _upcoming(self, movie_id: str) -> List[dict]:
+        now = datetime.now()
+        return sorted(
+            (
+                showtime for showtime in self.showtimes.values()
+                if showtime["movie_id"] == movie_id
+                and datetime.combine(showtime["show_date"], showtime["show_time"]) > now
+                and (showtime["is_active"] or self._confirmed(showtime["id"]))
+            ),
+            key=lambda showtime: showtime["id"]
+        )
+
+    def count_upcoming_showtimes(self, movie_id: str) -> int:
+        with self.lock:
+            return len(self._upcoming(movie_id))
+
+    def deactivate_upcoming_showtimes_chunk(self, movie_id: str,
+                                            chunk_size: int) -> List[Tuple[str, date]]:
+        with self.lock:
+            chunk = self._upcoming(movie_id)[:chunk_size]
+            for showtime in chunk:
+                showtime["is_active"] = False
+                self._bump_showtime(showtime["id"])
+            return [(showtime["id"], showtime["show_date"]) for showtime in chunk]
+
+    def _to_reprice(self, filters: dict) -> List[dict]:
+        return sorted(
+            (
+                showtime for showtime in self.showtimes.values()
+                if filters["start_date"] <= showtime["show_date"] <= filters["end_date"]
+                and showtime["is_active"]
+                and float(showtime["price"]) != float(filters["price"])
+                and (not filters.get("movie_id") or showtime["movie_id"] == filters["movie_id"])
+                and (not filters.get("theater_id") or showtime["theater_id"] == filters["theater_id"])
+            ),
+            key=lambda showtime: showtime["id"]
+        )
+
+    def count_showtimes_to_reprice(self, filters: dict) -> int:
+        with self.lock:
+            return len(self._to_reprice(filters))
+
+    def reprice_showtimes_chunk(self, filters: dict, after_id: str, chunk_size: int) -> List[str]:
+        with self.lock:
+            chunk = [
+                showtime for showtime in self._to_reprice(filters) if showtime["id"] > after_id
+            ][:chunk_size]
+            for showtime in chunk:
+                showtime["price"] = float(filters["price"])
+                self._bump_showtime(showtime["id"])
+            return [showtime["id"] for showtime in chunk]
+
+    # Analytics
+    def load_occupancy(self, theater_id: str, start_date: date,
+                       end_date: date) -> Optional[dict]:
+        with self.lock:
+            if theater_id not in self.theaters:
+                return None
+            showtimes = sorted(
+                (
+                    showtime for showtime in self.showtimes.values()
+                    if showtime["theater_id"] == theater_id and showtime["is_active"]
+                    and start_date <= showtime["show_date"] <= end_date
+                ),
+                key=lambda showtime: (showtime["show_date"], showtime["show_time"], showtime["id"])
+            )
+            showtime_index, seat_index, lead_hours = [], [], []
+            for index, showtime in enumerate(showtimes):
+                starts_at = datetime.combine(showtime["show_date"], showtime["show_time"])
+                for reservation in self._confirmed(showtime["id"]):
+                    lead = (starts_at - reservation["created_at"]).total_seconds() / 3600
+                    for seat_id in reservation["seat_ids"]:
+                        showtime_index.append(index)
+                        seat_index.append(self.seat_positions[seat_id][1])
+                        lead_hours.append(lead)
+            return {
+                "seats": [pick(seat, SEAT_FIELDS) for seat in self.theater_seats[theater_id]],
+                "showtimes": [pick(showtime, ("id", "show_date", "show_time")) for showtime in showtimes],
+                "showtime_index": showtime_index,
+                "seat_index": seat_index,
+                "lead_hours": lead_hours
+            }
+
+    # Reports
+    def reservation_report(self, start_date: Optional[date] = None,
+                           end_date: Optional[date] = None) -> List[dict]:
+        with self.lock:
+            report = []
+            for showtime in self.showtimes.values():
+                if start_date and showtime["show_date"] < start_date:
+                    continue
+                if end_date and showtime["show_date"] > end_date:
+                    continue
+                confirmed = self._confirmed(showtime["id"])
+                seats_booked = popcount(self.booked[showtime["id"]])
+                report.append({
+                    "showtime_id": showtime["id"],
+                    "movie_title": self.movies[showtime["movie_id"]]["title"],
+                    "show_date": showtime["show_date"],
+                    "show_time": showtime["show_time"],
+                    "theater_name": self.theaters[showtime["theater_id"]]["name"],
+                    "total_reservations": len(confirmed),
+                    "seats_booked": seats_booked,
+                    "seats_available": self.theaters[showtime["theater_id"]]["total_seats"] - seats_booked,
+                    "total_revenue": float(sum(reservation["total_price"] for reservation in confirmed))
+                })
+        return sorted(report, key=lambda row: (row["show_date"], row["show_time"]))
+
+    def summary_report(self) -> dict:
+        with self.lock:
+            confirmed = [
+                reservation for reservation in self.reservations.values()
+                if reservation["status"] == "confirmed"
+            ]
+            return {
+                "total_reservations": len(confirmed),
+                "total_revenue": float(sum(reservation["total_price"] for reservation in confirmed)),
+                "total_customers": len({reservation["user_id"] for reservation in confirmed}),
+                "total_seats_booked": len({
+                    seat_id for reservation in confirmed for seat_id in reservation["seat_ids"]
+                })
+            }
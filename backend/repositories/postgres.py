@@ -0,0 +1,942 @@
+"""
+PostgreSQL storage, the production backend.
+
+The hot queries are module-level constants so check_query_plans.py can
+EXPLAIN exactly what the API runs.
+"""
+
+import uuid
+from datetime import date
+from time import monotonic
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import event, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .base import (
+    ConflictError, DeadlineExceededError, NotFoundError, Repository, generate_booking_reference
+)
+
+MOVIE_COLUMNS = """
+    id, title, description, poster_image, genre,
+    duration_minutes, release_date, rating, is_active
+"""
+
+SHOWTIME_COLUMNS = "id, movie_id, theater_id, show_date, show_time, price, is_active"
+
+BULK_JOB_COLUMNS = """
+    id, kind, status, unit, total, processed, reservations_cancelled,
+    refunded_amount, error, started_at, updated_at, finished_at
+"""
+
+# Filters and ORDER BY are appended by list_showtimes
+LIST_SHOWTIMES_SQL = """
+    SELECT
+        s.id, s.movie_id, s.theater_id, s.show_date, s.show_time,
+        s.price, s.is_active,
+        m.title as movie_title,
+        t.name as theater_name,
+        t.total_seats - (
+            SELECT COUNT(*) FROM reservation_seats rs
+            JOIN reservations r ON rs.reservation_id = r.id
+                AND r.show_date = rs.show_date
+            WHERE rs.showtime_id = s.id
+            AND rs.show_date = s.show_date
+            AND r.status = 'confirmed'
+        ) as available_seats
+    FROM showtimes s
+    JOIN movies m ON s.movie_id = m.id
+    JOIN theaters t ON s.theater_id = t.id
+    WHERE s.is_active = true
+"""
+
+SEAT_LAYOUTS_SQL = """
+    SELECT theater_id, id, row_label, seat_number, seat_type
+    FROM seats
+    ORDER BY theater_id, row_label, seat_number
+"""
+
+# Seat maps are built from the cached seat layouts plus this list
+BOOKED_SEATS_SQL = """
+    SELECT sh.theater_id, ARRAY(
+        SELECT rs.seat_id FROM reservation_seats rs
+        JOIN reservations r ON rs.reservation_id = r.id
+            AND r.show_date = rs.show_date
+        WHERE rs.showtime_id = sh.id
+        AND rs.show_date = sh.show_date
+        AND r.status = 'confirmed'
+    ) as booked_seat_ids
+    FROM showtimes sh
+    WHERE sh.id = :showtime_id
+"""
+
+SHOWTIME_VERSIONS_SQL = """
+    SELECT s.version, m.version
+    FROM showtimes s
+    JOIN movies m ON s.movie_id = m.id
+    WHERE s.id = :showtime_id
+"""
+
+SHOWTIME_DETAIL_SQL = """
+    SELECT
+        s.id, s.movie_id, s.theater_id, s.show_date, s.show_time,
+        s.price, s.is_active, s.version,
+        m.title, m.description, m.poster_image, m.genre,
+        m.duration_minutes, m.release_date, m.rating, m.is_active, m.version,
+        t.name, t.total_seats,
+        (
+            SELECT json_agg(json_build_object(
+                'id', se.id,
+                'row_label', se.row_label,
+                'seat_number', se.seat_number,
+                'seat_type', se.seat_type,
+                'is_available', NOT EXISTS (
+                    SELECT 1 FROM reservation_seats rs
+                    JOIN reservations r ON rs.reservation_id = r.id
+                        AND r.show_date = rs.show_date
+                    WHERE rs.seat_id = se.id
+                    AND rs.showtime_id = s.id
+                    AND rs.show_date = s.show_date
+                    AND r.status = 'confirmed'
+                )
+            ) ORDER BY se.row_label, se.seat_number)
+            FROM seats se
+            WHERE se.theater_id = s.theater_id
+        ) as seats
+    FROM showtimes s
+    JOIN movies m ON s.movie_id = m.id
+    JOIN theaters t ON s.theater_id = t.id
+    WHERE s.id = :showtime_id
+"""
+
+# Locks are always taken showtimes first, then seats, each in id order, so
+# concurrent bookings never deadlock
+LOCK_SHOWTIMES_SQL = """
+    SELECT s.id, s.price, m.title, s.show_date, s.show_time, t.name
+    FROM showtimes s
+    JOIN movies m ON s.movie_id = m.id
+    JOIN theaters t ON s.theater_id = t.id
+    WHERE s.id = ANY(CAST(:showtime_ids AS uuid[])) AND s.is_active = true
+    ORDER BY s.id
+    FOR UPDATE OF s
+"""
+
+LOCK_AVAILABLE_SEATS_SQL = """
+    SELECT req.showtime_id, s.id, s.row_label, s.seat_number, s.seat_type
+    FROM unnest(CAST(:showtime_ids AS uuid[]), CAST(:seat_ids AS uuid[]))
+        AS req(showtime_id, seat_id)
+    JOIN showtimes sh ON sh.id = req.showtime_id
+    JOIN seats s ON s.id = req.seat_id AND s.theater_id = sh.theater_id
+    WHERE NOT EXISTS (
+        SELECT 1 FROM reservation_seats rs
+        JOIN reservations r ON rs.reservation_id = r.id
+            AND r.show_date = rs.show_date
+        WHERE rs.seat_id = s.id
+        AND rs.showtime_id = sh.id
+        AND rs.show_date = sh.show_date
+        AND r.status = 'confirmed'
+    )
+    ORDER BY s.id
+    FOR UPDATE OF s
+"""
+
+USER_RESERVATIONS_SQL = """
+    SELECT DISTINCT
+        r.id, r.booking_reference, r.showtime_id, r.total_price,
+        r.status, r.created_at,
+        m.title as movie_title,
+        s.show_date, s.show_time,
+        t.name as theater_name
+    FROM reservations_all r
+    JOIN showtimes s ON r.showtime_id = s.id
+    JOIN movies m ON s.movie_id = m.id
+    JOIN theaters t ON s.theater_id = t.id
+    WHERE r.user_id = :user_id
+    ORDER BY r.created_at DESC
+"""
+
+RESERVATION_SEATS_SQL = """
+    SELECT s.id, s.row_label, s.seat_number, s.seat_type
+    FROM reservation_seats_all rs
+    JOIN seats s ON rs.seat_id = s.id
+    WHERE rs.reservation_id = :reservation_id
+    AND rs.show_date = :show_date
+"""
+
+CONFIRMED_RESERVATION_SQL = """
+    SELECT r.id, r.show_date, s.show_time
+    FROM reservations r
+    JOIN showtimes s ON r.showtime_id = s.id
+    WHERE r.id = :reservation_id
+    AND r.user_id = :user_id
+    AND r.status = 'confirmed'
+"""
+
+CANCEL_RESERVATIONS_CHUNK_SQL = """
+    WITH batch AS (
+        SELECT id FROM reservations
+        WHERE showtime_id = :showtime_id
+        AND show_date = :show_date
+        AND status = 'confirmed'
+        LIMIT :chunk_size
+        FOR UPDATE
+    )
+    UPDATE reservations r
+    SET status = 'cancelled', cancelled_at = CURRENT_TIMESTAMP
+    FROM batch
+    WHERE r.id = batch.id AND r.show_date = :show_date
+    RETURNING r.total_price
+"""
+
+# Showtimes are deactivated before their reservations are cancelled, so
+# inactive ones with confirmed reservations left are picked up again
+UPCOMING_SHOWTIMES_FILTER = """
+    movie_id = :movie_id
+    AND (show_date > CURRENT_DATE
+         OR (show_date = CURRENT_DATE AND show_time > LOCALTIME))
+    AND (is_active = true OR EXISTS (
+        SELECT 1 FROM reservations r
+        WHERE r.showtime_id = showtimes.id
+        AND r.show_date = showtimes.show_date
+        AND r.status = 'confirmed'
+    ))
+"""
+
+# Filters and ORDER BY are appended by reservation_report
+RESERVATION_REPORT_SQL = """
+    SELECT * FROM reservation_summary
+    WHERE 1=1
+"""
+
+SUMMARY_REPORT_SQL = """
+    SELECT
+        COUNT(DISTINCT r.id) as total_reservations,
+        SUM(r.total_price) as total_revenue,
+        COUNT(DISTINCT r.user_id) as total_customers,
+        COUNT(DISTINCT rs.seat_id) as total_seats_booked
+    FROM reservations_all r
+    LEFT JOIN reservation_seats_all rs ON r.id = rs.reservation_id
+        AND r.show_date = rs.show_date
+    WHERE r.status = 'confirmed'
+"""
+
+
+# Seat positions and showtime indexes follow the ORDER BYs of the two queries
+# above, so the booking arrays can be decoded against their results
+THEATER_SEATS_SQL = """
+    SELECT id, row_label, seat_number, seat_type
+    FROM seats
+    WHERE theater_id = :theater_id
+    ORDER BY row_label, seat_number, id
+"""
+
+THEATER_SHOWTIMES_SQL = """
+    SELECT id, show_date, show_time
+    FROM showtimes
+    WHERE theater_id = :theater_id
+    AND show_date BETWEEN :start_date AND :end_date
+    AND is_active = true
+    ORDER BY show_date, show_time, id
+"""
+
+OCCUPANCY_SQL = """
+    WITH st AS (
+        SELECT id, show_date, show_date + show_time AS starts_at,
+            row_number() OVER (ORDER BY show_date, show_time, id) - 1 AS idx
+        FROM showtimes
+        WHERE theater_id = :theater_id
+        AND show_date BETWEEN :start_date AND :end_date
+        AND is_active = true
+    ), se AS (
+        SELECT id, row_number() OVER (ORDER BY row_label, seat_number, id) - 1 AS pos
+        FROM seats
+        WHERE theater_id = :theater_id
+    )
+    SELECT
+        array_agg(st.idx),
+        array_agg(se.pos),
+        array_agg(CAST(EXTRACT(EPOCH FROM st.starts_at - r.created_at) AS float8) / 3600)
+    FROM st
+    JOIN reservation_seats_all rs ON rs.showtime_id = st.id AND rs.show_date = st.show_date
+    JOIN reservations_all r ON rs.reservation_id = r.id AND r.show_date = rs.show_date
+    JOIN se ON se.id = rs.seat_id
+    WHERE r.status = 'confirmed'
+    AND rs.show_date BETWEEN :start_date AND :end_date
+    AND r.show_date BETWEEN :start_date AND :end_date
+"""
+
+# Read paths run by warm_up, with parameters that match nothing
+WARMUP_QUERIES = [
+    LIST_SHOWTIMES_SQL + " AND s.show_date = :show_date ORDER BY s.show_date, s.show_time",
+    BOOKED_SEATS_SQL,
+    SHOWTIME_VERSIONS_SQL,
+    SHOWTIME_DETAIL_SQL,
+    USER_RESERVATIONS_SQL,
+    RESERVATION_SEATS_SQL,
+]
+
+
+def movie_from_row(row) -> dict:
+    return {
+        "id": str(row[0]),
+        "title": row[1],
+        "description": row[2],
+        "poster_image": row[3],
+        "genre": row[4],
+        "duration_minutes": row[5],
+        "release_date": row[6],
+        "rating": row[7],
+        "is_active": row[8]
+    }
+
+
+def showtime_from_row(row) -> dict:
+    return {
+        "id": str(row[0]),
+        "movie_id": str(row[1]),
+        "theater_id": str(row[2]),
+        "show_date": row[3],
+        "show_time": row[4],
+        "price": float(row[5]),
+        "is_active": row[6]
+    }
+
+
+def seat_from_row(row) -> dict:
+    return {
+        "id": str(row[0]),
+        "row_label": row[1],
+        "seat_number": row[2],
+        "seat_type": row[3]
+    }
+
+
+def bulk_job_from_row(row) -> dict:
+    return {
+        "id": str(row[0]),
+        "kind": row[1],
+        "status": row[2],
+        "unit": row[3],
+        "total": row[4],
+        "processed": row[5],
+        "reservations_cancelled": row[6],
+        "refunded_amount": float(row[7]),
+        "error": row[8],
+        "started_at": row[9],
+        "updated_at": row[10],
+        "finished_at": row[11]
+    }
+
+
+def reprice_filter(filters: dict) -> str:
+    query = """
+        show_date BETWEEN :start_date AND :end_date
+        AND is_active = true
+        AND price <> CAST(:price AS numeric(10, 2))
+    """
+    if filters.get("movie_id"):
+        query += " AND movie_id = :movie_id"
+    if filters.get("theater_id"):
+        query += " AND theater_id = :theater_id"
+    return query
+
+
+# statement_timeout is only lowered again once it exceeds the time left by
+# more than this, so short requests set it once per transaction
+DEADLINE_SLACK_MS = 100
+
+
+class PostgresRepository(Repository):
+    def __init__(self, db: Session, deadline: Optional[float] = None):
+        """deadline: time.monotonic() value after which no statement may run"""
+        self.db = db
+        self.deadline = deadline
+        # The statement_timeout set in the current transaction, if any
+        self.statement_timeout_ms = None
+        if deadline is not None:
+            event.listen(db, "after_begin", self._reset_statement_timeout)
+            event.listen(db, "do_orm_execute", self._apply_deadline)
+
+    def _reset_statement_timeout(self, session, transaction, connection):
+        self.statement_timeout_ms = None
+
+    def _apply_deadline(self, orm_execute_state):
+        # Begins the transaction if needed, which resets statement_timeout_ms;
+        # may wait for a pooled connection, so the time left is taken after
+        connection = self.db.connection()
+        remaining_ms = int((self.deadline - monotonic()) * 1000)
+        if remaining_ms <= 0:
+            raise DeadlineExceededError("Request took too long")
+        if self.statement_timeout_ms is None or self.statement_timeout_ms - remaining_ms > DEADLINE_SLACK_MS:
+            # SET LOCAL ends with the transaction, so the pooled connection
+            # goes back with the server default
+            connection.exec_driver_sql(f"SET LOCAL statement_timeout = {remaining_ms}")
+            self.statement_timeout_ms = remaining_ms
+
+    def _write(self, query: str, params: Optional[dict] = None):
+        """Run a single write statement and commit it"""
+        try:
+            result = self.db.execute(text(query), params or {})
+            rows = result.fetchall() if result.returns_rows else None
+            self.db.commit()
+            return rows
+        except Exception:
+            self.db.rollback()
+            raise
+
+    # Health
+    def ping(self):
+        self.db.execute(text("SELECT 1"))
+
+    def warm_up(self):
+        # Each backend builds its catalog and partition metadata caches on
+        # first use; the session keeps its connection until it is closed
+        params = {
+            "showtime_id": str(uuid.UUID(int=0)),
+            "user_id": str(uuid.UUID(int=0)),
+            "reservation_id": str(uuid.UUID(int=0)),
+            "show_date": date.today()
+        }
+        for query in WARMUP_QUERIES:
+            self.db.execute(text(query), params).fetchall()
+
+    # Users
+    def get_user(self, user_id: str) -> Optional[dict]:
+        row = self.db.execute(
+            text("SELECT id, email, full_name, role FROM users WHERE id = :id"),
+            {"id": user_id}
+        ).fetchone()
+        if row is None:
+            return None
+        return {"id": str(row[0]), "email": row[1], "full_name": row[2], "role": row[3]}
+
+    def get_user_by_email(self, email: str) -> Optional[dict]:
+        row = self.db.execute(
+            text("SELECT id, email, password_hash, full_name, role FROM users WHERE email = :email"),
+            {"email": email}
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            "id": str(row[0]),
+            "email": row[1],
+            "password_hash": row[2],
+            "full_name": row[3],
+            "role": row[4]
+        }
+
+    def create_user(self, email: str, password_hash: str, full_name: str) -> dict:
+        try:
+            rows = self._write(
+                """
+                    INSERT INTO users (email, password_hash, full_name, role)
+                    VALUES (:email, :password_hash, :full_name, 'user')
+                    RETURNING id, email, full_name, role
+                """,
+                {"email": email, "password_hash": password_hash, "full_name": full_name}
+            )
+        except IntegrityError:
+            raise ConflictError("Email already registered")
+        row = rows[0]
+        return {"id": str(row[0]), "email": row[1], "full_name": row[2], "role": row[3]}
+
+    # Movies
+    def list_movies(self, genre: Optional[str] = None) -> List[dict]:
+        query = f"SELECT {MOVIE_COLUMNS} FROM movies WHERE is_active = true"
+        params = {}
+
+        if genre:
+            query += " AND genre = :genre"
+            params["genre"] = genre
+
+        query += " ORDER BY release_date DESC"
+
+        return [movie_from_row(row) for row in self.db.execute(text(query), params)]
+
+    def get_movie(self, movie_id: str) -> Optional[dict]:
+        row = self.db.execute(
+            text(f"SELECT {MOVIE_COLUMNS} FROM movies WHERE id = :id"),
+            {"id": movie_id}
+        ).fetchone()
+        return movie_from_row(row) if row else None
+
+    def create_movie(self, movie: dict) -> dict:
+        rows = self._write(
+            f"""
+                INSERT INTO movies (title, description, poster_image, genre,
+                                   duration_minutes, release_date, rating)
+                VALUES (:title, :description, :poster_image, :genre,
+                        :duration_minutes, :release_date, :rating)
+                RETURNING {MOVIE_COLUMNS}
+            """,
+            movie
+        )
+        return movie_from_row(rows[0])
+
+    def update_movie(self, movie_id: str, movie: dict) -> Optional[dict]:
+        rows = self._write(
+            f"""
+                UPDATE movies SET
+                    title = :title,
+                    description = :description,
+                    poster_image = :poster_image,
+                    genre = :genre,
+                    duration_minutes = :duration_minutes,
+                    release_date = :release_date,
+                    rating = :rating
+                WHERE id = :id
+                RETURNING {MOVIE_COLUMNS}
+            """,
+            {**movie, "id": movie_id}
+        )
+        return movie_from_row(rows[0]) if rows else None
+
+    def deactivate_movie(self, movie_id: str) -> bool:
+        rows = self._write(
+            "UPDATE movies SET is_active = false WHERE id = :id RETURNING id",
+            {"id": movie_id}
+        )
+        return bool(rows)
+
+    # Theaters
+    def list_theaters(self) -> List[dict]:
+        return [
+            {"id": str(row[0]), "name": row[1], "total_seats": row[2]}
+            for row in self.db.execute(text("SELECT id, name, total_seats FROM theaters"))
+        ]
+
+    def get_seat_layouts(self) -> Dict[str, List[dict]]:
+        layouts = {}
+        for row in self.db.execute(text(SEAT_LAYOUTS_SQL)):
+            layouts.setdefault(str(row[0]), []).append(seat_from_row(row[1:]))
+        return layouts
+
+    # Showtimes
+    def list_showtimes(self, movie_id: Optional[str] = None,
+                       show_date: Optional[date] = None) -> List[dict]:
+        query = LIST_SHOWTIMES_SQL
+        params = {}
+
+        if movie_id:
+            query += " AND s.movie_id = :movie_id"
+            params["movie_id"] = movie_id
+
+        if show_date:
+            query += " AND s.show_date = :show_date"
+            params["show_date"] = show_date
+
+        query += " ORDER BY s.show_date, s.show_time"
+
+        return [
+            {
+                **showtime_from_row(row),
+                "movie_title": row[7],
+                "theater_name": row[8],
+                "available_seats": row[9]
+            }
+            for row in self.db.execute(text(query), params)
+        ]
+
+    def create_showtime(self, showtime: dict) -> dict:
+        try:
+            row = self.db.execute(
+                text(f"""
+                    INSERT INTO showtimes (movie_id, theater_id, show_date, show_time, price)
+                    VALUES (:movie_id, :theater_id, :show_date, :show_time, :price)
+                    RETURNING {SHOWTIME_COLUMNS}
+                """),
+                showtime
+            ).fetchone()
+            # Make sure reservations for this date have a partition to land in
+            self.db.execute(
+                text("SELECT create_reservation_partitions(:show_date, :show_date)"),
+                {"show_date": showtime["show_date"]}
+            )
+            self.db.commit()
+        except IntegrityError:
+            self.db.rollback()
+            raise ConflictError("Theater already has a show at this time")
+        except Exception:
+            self.db.rollback()
+            raise
+        return showtime_from_row(row)
+
+    def get_booked_seats(self, showtime_id: str) -> Optional[Tuple[str, Set[str]]]:
+        row = self.db.execute(
+            text(BOOKED_SEATS_SQL), {"showtime_id": showtime_id}
+        ).fetchone()
+        if not row:
+            return None
+        return str(row[0]), {str(seat_id) for seat_id in row[1]}
+
+    def get_showtime_versions(self, showtime_id: str) -> Optional[Tuple[int, int]]:
+        row = self.db.execute(
+            text(SHOWTIME_VERSIONS_SQL), {"showtime_id": showtime_id}
+        ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def get_showtime_detail(self, showtime_id: str) -> Optional[dict]:
+        row = self.db.execute(
+            text(SHOWTIME_DETAIL_SQL), {"showtime_id": showtime_id}
+        ).fetchone()
+        if not row:
+            return None
+
+        seats = row[19] or []
+        return {
+            **showtime_from_row(row),
+            "version": row[7],
+            "movie_version": row[16],
+            "movie_title": row[8],
+            "theater_name": row[17],
+            "available_seats": sum(1 for seat in seats if seat["is_available"]),
+            "movie": movie_from_row((row[1],) + tuple(row[8:16])),
+            "total_seats": row[18],
+            "seats": seats
+        }
+
+    # Reservations
+    def reserve_seats(self, user_id: str, seats_by_showtime: Dict[str, List[str]]) -> List[dict]:
+        try:
+            reservations = self._reserve_seats(user_id, seats_by_showtime)
+            self.db.commit()
+            return reservations
+        except IntegrityError:
+            self.db.rollback()
+            raise ConflictError("Seats are already booked. Please select different seats.")
+        except Exception:
+            self.db.rollback()
+            raise
+
+    def _reserve_seats(self, user_id: str, seats_by_showtime: Dict[str, List[str]]) -> List[dict]:
+        showtime_results = self.db.execute(
+            text(LOCK_SHOWTIMES_SQL),
+            {"showtime_ids": list(seats_by_showtime)}
+        ).fetchall()
+
+        if len(showtime_results) != len(seats_by_showtime):
+            raise NotFoundError("Showtime not found")
+
+        showtimes = {str(row[0]): row for row in showtime_results}
+        requested = [
+            (showtime_id, seat_id)
+            for showtime_id, seat_ids in seats_by_showtime.items()
+            for seat_id in seat_ids
+        ]
+
+        seat_check = self.db.execute(
+            text(LOCK_AVAILABLE_SEATS_SQL),
+            {
+                "showtime_ids": [showtime_id for showtime_id, _ in requested],
+                "seat_ids": [seat_id for _, seat_id in requested]
+            }
+        ).fetchall()
+
+        if len(seat_check) != len(requested):
+            raise ConflictError("One or more seats are not available or do not exist")
+
+        seats = {}
+        for seat in seat_check:
+            seats.setdefault(str(seat[0]), []).append(seat_from_row(seat[1:]))
+
+        showtime_ids = sorted(seats_by_showtime)
+        totals = [showtimes[sid][1] * len(seats_by_showtime[sid]) for sid in showtime_ids]
+        booking_refs = [generate_booking_reference() for _ in showtime_ids]
+
+        reservation_results = self.db.execute(
+            text("""
+                INSERT INTO reservations
+                    (user_id, showtime_id, show_date, total_price, booking_reference, status)
+                SELECT :user_id, x.showtime_id, x.show_date, x.total_price, x.booking_ref, 'confirmed'
+                FROM unnest(
+                    CAST(:showtime_ids AS uuid[]), CAST(:show_dates AS date[]),
+                    CAST(:totals AS numeric[]), CAST(:booking_refs AS varchar[])
+                ) AS x(showtime_id, show_date, total_price, booking_ref)
+                RETURNING id, showtime_id, created_at
+            """),
+            {
+                "user_id": user_id,
+                "showtime_ids": showtime_ids,
+                "show_dates": [showtimes[sid][3] for sid in showtime_ids],
+                "totals": totals,
+                "booking_refs": booking_refs
+            }
+        ).fetchall()
+
+        reservation_ids = {str(row[1]): (str(row[0]), row[2]) for row in reservation_results}
+        totals = dict(zip(showtime_ids, totals))
+        booking_refs = dict(zip(showtime_ids, booking_refs))
+
+        self.db.execute(
+            text("""
+                INSERT INTO reservation_seats
+                    (reservation_id, showtime_id, show_date, seat_id)
+                SELECT * FROM unnest(
+                    CAST(:reservation_ids AS uuid[]), CAST(:showtime_ids AS uuid[]),
+                    CAST(:show_dates AS date[]), CAST(:seat_ids AS uuid[])
+                )
+            """),
+            {
+                "reservation_ids": [reservation_ids[sid][0] for sid, _ in requested],
+                "showtime_ids": [sid for sid, _ in requested],
+                "show_dates": [showtimes[sid][3] for sid, _ in requested],
+                "seat_ids": [seat_id for _, seat_id in requested]
+            }
+        )
+
+        return [
+            {
+                "id": reservation_ids[sid][0],
+                "booking_reference": booking_refs[sid],
+                "showtime_id": sid,
+                "movie_title": showtimes[sid][2],
+                "show_date": showtimes[sid][3],
+                "show_time": showtimes[sid][4],
+                "theater_name": showtimes[sid][5],
+                "seats": seats[sid],
+                "total_price": float(totals[sid]),
+                "status": "confirmed",
+                "created_at": reservation_ids[sid][1]
+            }
+            for sid in seats_by_showtime
+        ]
+
+    def list_user_reservations(self, user_id: str) -> List[dict]:
+        results = self.db.execute(
+            text(USER_RESERVATIONS_SQL), {"user_id": user_id}
+        ).fetchall()
+
+        reservations = []
+        for row in results:
+            seats_result = self.db.execute(
+                text(RESERVATION_SEATS_SQL),
+                {"reservation_id": str(row[0]), "show_date": row[7]}
+            )
+            reservations.append({
+                "id": str(row[0]),
+                "booking_reference": row[1],
+                "showtime_id": str(row[2]),
+                "total_price": float(row[3]),
+                "status": row[4],
+                "created_at": row[5],
+                "movie_title": row[6],
+                "show_date": row[7],
+                "show_time": row[8],
+                "theater_name": row[9],
+                "seats": [seat_from_row(seat) for seat in seats_result]
+            })
+
+        return reservations
+
+    def get_confirmed_reservation(self, user_id: str, reservation_id: str) -> Optional[dict]:
+        row = self.db.execute(
+            text(CONFIRMED_RESERVATION_SQL),
+            {"reservation_id": reservation_id, "user_id": user_id}
+        ).fetchone()
+        if not row:
+            return None
+        return {"id": str(row[0]), "show_date": row[1], "show_time": row[2]}
+
+    def cancel_reservation(self, reservation_id: str, show_date: date):
+        self._write(
+            """
+                UPDATE reservations
+                SET status = 'cancelled', cancelled_at = CURRENT_TIMESTAMP
+                WHERE id = :reservation_id AND show_date = :show_date
+                AND status = 'confirmed'
+            """,
+            {"reservation_id": reservation_id, "show_date": show_date}
+        )
+
+    # Bulk admin operations
+    def create_bulk_job(self, kind: str, unit: str, total: int) -> dict:
+        rows = self._write(
+            f"""
+                INSERT INTO bulk_jobs (kind, unit, total)
+                VALUES (:kind, :unit, :total)
+                RETURNING {BULK_JOB_COLUMNS}
+            """,
+            {"kind": kind, "unit": unit, "total": total}
+        )
+        return bulk_job_from_row(rows[0])
+
+    def save_bulk_job(self, job: dict):
+        self._write(
+            """
+                UPDATE bulk_jobs SET
+                    status = :status,
+                    processed = :processed,
+                    reservations_cancelled = :reservations_cancelled,
+                    refunded_amount = :refunded_amount,
+                    error = :error,
+                    updated_at = CURRENT_TIMESTAMP,
+                    finished_at = CASE WHEN :status = 'running' THEN NULL ELSE CURRENT_TIMESTAMP END
+                WHERE id = :id
+            """,
+            job
+        )
+
+    def get_bulk_job(self, job_id: str) -> Optional[dict]:
+        row = self.db.execute(
+            text(f"SELECT {BULK_JOB_COLUMNS} FROM bulk_jobs WHERE id = :id"),
+            {"id": job_id}
+        ).fetchone()
+        return bulk_job_from_row(row) if row else None
+
+    def deactivate_showtime(self, showtime_id: str) -> Optional[date]:
+        rows = self._write(
+            """
+                UPDATE showtimes SET is_active = false
+                WHERE id = :showtime_id
+                RETURNING show_date
+            """,
+            {"showtime_id": showtime_id}
+        )
+        return rows[0][0] if rows else None
+
+    def count_confirmed_reservations(self, showtime_id: str, show_date: date) -> int:
+        return self.db.execute(
+            text("""
+                SELECT COUNT(*) FROM reservations
+                WHERE showtime_id = :showtime_id
+                AND show_date = :show_date
+                AND status = 'confirmed'
+            """),
+            {"showtime_id": showtime_id, "show_date": show_date}
+        ).scalar()
+
+    def cancel_reservations_chunk(self, showtime_id: str, show_date: date,
+                                  chunk_size: int) -> List[float]:
+        rows = self._write(
+            CANCEL_RESERVATIONS_CHUNK_SQL,
+            {"showtime_id": showtime_id, "show_date": show_date, "chunk_size": chunk_size}
+        )
+        return [float(row[0]) for row in rows]
+
+    def count_upcoming_showtimes(self, movie_id: str) -> int:
+        return self.db.execute(
+            text(f"SELECT COUNT(*) FROM showtimes WHERE {UPCOMING_SHOWTIMES_FILTER}"),
+            {"movie_id": movie_id}
+        ).scalar()
+
+    def deactivate_upcoming_showtimes_chunk(self, movie_id: str,
+                                            chunk_size: int) -> List[Tuple[str, date]]:
+        rows = self._write(
+            f"""
+                WITH batch AS (
+                    SELECT id FROM showtimes
+                    WHERE {UPCOMING_SHOWTIMES_FILTER}
+                    ORDER BY id
+                    LIMIT :chunk_size
+                    FOR UPDATE
+                )
+                UPDATE showtimes s SET is_active = false
+                FROM batch
+                WHERE s.id = batch.id
+                RETURNING s.id, s.show_date
+            """,
+            {"movie_id": movie_id, "chunk_size": chunk_size}
+        )
+        return [(str(row[0]), row[1]) for row in rows]
+
+    def count_showtimes_to_reprice(self, filters: dict) -> int:
+        return self.db.execute(
+            text(f"SELECT COUNT(*) FROM showtimes WHERE {reprice_filter(filters)}"),
+            filters
+        ).scalar()
+
+    def reprice_showtimes_chunk(self, filters: dict, after_id: str, chunk_size: int) -> List[str]:
+        # Walks the showtimes in id order, so the job ends even if a price
+        # never compares equal after being stored
+        rows = self._write(
+            f"""
+                WITH batch AS (
+                    SELECT id FROM showtimes
+                    WHERE {reprice_filter(filters)}
+                    AND id > :after_id
+                    ORDER BY id
+                    LIMIT :chunk_size
+                    FOR UPDATE
+                )
+                UPDATE showtimes s SET price = :price
+                FROM batch
+                WHERE s.id = batch.id
+                RETURNING s.id
+            """,
+            {**filters, "after_id": after_id, "chunk_size": chunk_size}
+        )
+        return sorted(str(row[0]) for row in rows)
+
+    # Analytics
+    def load_occupancy(self, theater_id: str, start_date: date,
+                       end_date: date) -> Optional[dict]:
+        params = {"theater_id": theater_id, "start_date": start_date, "end_date": end_date}
+        # The booking arrays index into the seat and showtime lists, so all
+        # three queries must read the same snapshot
+        self.db.commit()
+        self.db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+        try:
+            seats = [seat_from_row(row) for row in self.db.execute(text(THEATER_SEATS_SQL), params)]
+            if not seats and not self.db.execute(
+                text("SELECT 1 FROM theaters WHERE id = :theater_id"), params
+            ).fetchone():
+                return None
+
+            showtimes = [
+                {"id": str(row[0]), "show_date": row[1], "show_time": row[2]}
+                for row in self.db.execute(text(THEATER_SHOWTIMES_SQL), params)
+            ]
+            showtime_index, seat_index, lead_hours = self.db.execute(
+                text(OCCUPANCY_SQL), params
+            ).fetchone()
+        finally:
+            self.db.rollback()
+
+        return {
+            "seats": seats,
+            "showtimes": showtimes,
+            "showtime_index": showtime_index or [],
+            "seat_index": seat_index or [],
+            "lead_hours": lead_hours or []
+        }
+
+    # Reports
+    def reservation_report(self, start_date: Optional[date] = None,
+                           end_date: Optional[date] = None) -> List[dict]:
+        query = RESERVATION_REPORT_SQL
+        params = {}
+
+        if start_date:
+            query += " AND show_date >= :start_date"
+            params["start_date"] = start_date
+
+        if end_date:
+            query += " AND show_date <= :end_date"
+            params["end_date"] = end_date
+
+        query += " ORDER BY show_date, show_time"
+
+        return [
+            {
+                "showtime_id": str(row[0]),
+                "movie_title": row[1],
+                "show_date": row[2],
+                "show_time": row[3],
+                "theater_name": row[4],
+                "total_reservations": row[5],
+                "seats_booked": row[6],
+                "seats_available": row[7],
+                "total_revenue": float(row[8]) if row[8] else 0.0
+            }
+            for row in self.db.execute(text(query), params)
+        ]
+
+    def summary_report(self) -> dict:
+        result = self.db.execute(text(SUMMARY_REPORT_SQL)).fetchone()
+        return {
+            "total_reservations": result[0] or 0,
+            "total_revenue": float(result[1]) if result[1] else 0.0,
+            "total_customers": result[2] or 0,
+            "total_seats_booked": result[3] or 0
+        }
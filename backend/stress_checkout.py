@@ -0,0 +1,191 @@
+"""
+Concurrency stress test for cart checkout.
+
+Creates a throwaway database, then runs many threads that check out random,
+heavily overlapping carts (several showtimes in the same theater, a small pool
+of popular seats) through PostgresRepository.reserve_seats(). Fails if any checkout deadlocks,
+errors unexpectedly, double-books a seat or leaves a partial cart behind.
+
+Usage:
+    python stress_checkout.py [--database-url URL] [--threads N] [--carts N]
+"""
+
+import argparse
+import random
+import sys
+import threading
+import uuid
+from collections import Counter
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from migrate import apply_migrations
+from repositories import PostgresRepository, RepositoryError
+
+SEED_SQL = """
+    INSERT INTO theaters (name, total_seats) VALUES ('Stress 1', 40), ('Stress 2', 40);
+    INSERT INTO seats (theater_id, row_label, seat_number)
+    SELECT t.id, chr(64 + r), n FROM theaters t, generate_series(1, 4) r, generate_series(1, 10) n;
+    INSERT INTO movies (title, genre, duration_minutes) VALUES ('Stress', 'Drama', 100);
+    INSERT INTO showtimes (movie_id, theater_id, show_date, show_time, price)
+    SELECT m.id, t.id, :show_date, TIME '10:00' + slot * INTERVAL '3 hours', 10
+    FROM movies m, theaters t, generate_series(0, 2) slot;
+    SELECT create_reservation_partitions(:show_date, :show_date);
+"""
+
+
+def seed(engine, threads: int):
+    with engine.begin() as conn:
+        conn.execute(text(SEED_SQL), {"show_date": date.today() + timedelta(days=1)})
+        users = [
+            str(conn.execute(
+                text("""
+                    INSERT INTO users (email, password_hash, full_name)
+                    VALUES (:email, 'x', 'Stress') RETURNING id
+                """),
+                {"email": f"stress{i}@example.com"}
+            ).scalar())
+            for i in range(threads)
+        ]
+        showtimes = {}
+        for showtime_id, theater_id in conn.execute(text("SELECT id, theater_id FROM showtimes")):
+            showtimes[str(showtime_id)] = theater_id
+        seats = {}
+        for seat_id, theater_id in conn.execute(
+            text("SELECT id, theater_id FROM seats ORDER BY row_label, seat_number")
+        ):
+            seats.setdefault(theater_id, []).append(str(seat_id))
+    return users, {sid: seats[tid] for sid, tid in showtimes.items()}
+
+
+def random_cart(rng: random.Random, seat_map: dict):
+    cart = []
+    for showtime_id in rng.sample(sorted(seat_map), rng.randint(1, 3)):
+        # Carts fight over the front rows of the same theaters
+        popular = seat_map[showtime_id][:30]
+        cart.append((showtime_id, rng.sample(popular, rng.randint(1, 3))))
+    rng.shuffle(cart)
+    return cart
+
+
+def worker(session_factory, user_id, seat_map, carts, seed_value, results, lock):
+    rng = random.Random(seed_value)
+    for _ in range(carts):
+        cart = random_cart(rng, seat_map)
+        db = session_factory()
+        try:
+            PostgresRepository(db).reserve_seats(user_id, dict(cart))
+            outcome = "booked"
+        except RepositoryError:
+            outcome = "rejected"
+        except OperationalError as e:
+            outcome = "deadlock" if getattr(e.orig, "pgcode", None) == "40P01" else "error"
+        except Exception:
+            outcome = "error"
+        finally:
+            db.close()
+        with lock:
+            results[outcome] += 1
+            if outcome == "booked":
+                results["booked_seats"].update((sid, seat) for sid, seat_ids in cart for seat in seat_ids)
+                results["booked_reservations"] += len(cart)
+
+
+def verify(engine, results) -> list:
+    problems = []
+    with engine.connect() as conn:
+        rows = conn.execute(text("""
+            SELECT rs.showtime_id, rs.seat_id
+            FROM reservation_seats rs
+            JOIN reservations r ON rs.reservation_id = r.id AND r.show_date = rs.show_date
+            WHERE r.status = 'confirmed'
+        """)).fetchall()
+        reservation_count = conn.execute(text("SELECT COUNT(*) FROM reservations")).scalar()
+
+    booked = Counter((str(row[0]), str(row[1])) for row in rows)
+    double_booked = [key for key, count in booked.items() if count > 1]
+    if double_booked:
+        problems.append(f"{len(double_booked)} seat(s) booked more than once")
+    if set(booked) != set(results["booked_seats"]):
+        problems.append("booked seats don't match successful carts (partial booking)")
+    if reservation_count != results["booked_reservations"]:
+        problems.append(
+            f"{reservation_count} reservations stored for "
+            f"{results['booked_reservations']} successfully checked out"
+        )
+    return problems
+
+
+def run_checkouts(engine, threads: int, carts: int):
+    """Seed engine's database and check out carts concurrently; returns (results, problems)"""
+    users, seat_map = seed(engine, threads)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    results = {
+        "booked": 0, "rejected": 0, "deadlock": 0, "error": 0,
+        "booked_reservations": 0, "booked_seats": set()
+    }
+    lock = threading.Lock()
+    workers = [
+        threading.Thread(
+            target=worker,
+            args=(session_factory, users[i], seat_map, carts, i, results, lock)
+        )
+        for i in range(threads)
+    ]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+
+    return results, verify(engine, results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stress test concurrent cart checkout")
+    parser.add_argument("--database-url", help="defaults to the API's DATABASE_URL")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--carts", type=int, default=25, help="checkouts per thread")
+    args = parser.parse_args()
+
+    if args.database_url:
+        engine = create_engine(args.database_url)
+    else:
+        from main import engine
+
+    database = f"stress_{uuid.uuid4().hex[:8]}"
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text(f'CREATE DATABASE "{database}"'))
+    stress_engine = create_engine(
+        engine.url.set(database=database), pool_size=args.threads, max_overflow=0
+    )
+
+    try:
+        apply_migrations(stress_engine)
+        results, problems = run_checkouts(stress_engine, args.threads, args.carts)
+    finally:
+        stress_engine.dispose()
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text(f'DROP DATABASE "{database}"'))
+
+    print(
+        f"booked {results['booked']}, rejected {results['rejected']}, "
+        f"deadlocks {results['deadlock']}, errors {results['error']}"
+    )
+    if results["deadlock"]:
+        problems.append(f"{results['deadlock']} checkout(s) deadlocked")
+    if results["error"]:
+        problems.append(f"{results['error']} checkout(s) failed unexpectedly")
+
+    for problem in problems:
+        print(f"FAIL  {problem}")
+    if problems:
+        sys.exit(1)
+    print("No deadlocks or partial bookings")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+API test fixtures.
+
+Every test runs against the in-memory repository. Set TEST_DATABASE_URL to a
+Postgres server URL to run them against Postgres as well: a throwaway
+database is created there, migrated, emptied between tests and dropped at
+the end. Tests that only make sense on Postgres (query plans, concurrency)
+are skipped without it.
+"""
+
+import os
+import uuid
+from contextlib import ExitStack, contextmanager
+
+import bcrypt
+import pytest
+
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+import main
+from migrate import apply_migrations
+from repositories import MemoryRepository
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+BACKENDS = ["memory"] + (["postgres"] if TEST_DATABASE_URL else [])
+
+BCRYPT_GENSALT = bcrypt.gensalt
+
+
+def fast_gensalt() -> bytes:
+    """The fewest rounds bcrypt allows; the default makes every login take ~0.2s"""
+    return BCRYPT_GENSALT(rounds=4)
+
+
+class MemoryStore:
+    """Seeds the in-memory repository"""
+
+    def __init__(self):
+        self.repo = MemoryRepository()
+
+    def add_user(self, email: str, password: str, full_name: str, role: str = "user") -> dict:
+        return self.repo.add_user(email, main.hash_password(password), full_name, role)
+
+    def add_theater(self, name: str, rows: int, seats_per_row: int) -> dict:
+        return self.repo.add_theater(name, rows, seats_per_row)
+
+
+class PostgresStore:
+    """Seeds the test database with the same data MemoryStore would"""
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def add_user(self, email: str, password: str, full_name: str, role: str = "user") -> dict:
+        with self.engine.begin() as conn:
+            user_id = conn.execute(
+                text("""
+                    INSERT INTO users (email, password_hash, full_name, role)
+                    VALUES (:email, :password_hash, :full_name, :role)
+                    RETURNING id
+                """),
+                {"email": email, "password_hash": main.hash_password(password),
+                 "full_name": full_name, "role": role}
+            ).scalar()
+        return {"id": str(user_id), "email": email, "full_name": full_name, "role": role}
+
+    def add_theater(self, name: str, rows: int, seats_per_row: int) -> dict:
+        with self.engine.begin() as conn:
+            theater_id = conn.execute(
+                text("INSERT INTO theaters (name, total_seats) VALUES (:name, :total) RETURNING id"),
+                {"name": name, "total": rows * seats_per_row}
+            ).scalar()
+            conn.execute(
+                text("""
+                    INSERT INTO seats (theater_id, row_label, seat_number, seat_type)
+                    SELECT :theater_id, chr(64 + r), n, 'standard'
+                    FROM generate_series(1, :rows) r, generate_series(1, :seats_per_row) n
+                """),
+                {"theater_id": theater_id, "rows": rows, "seats_per_row": seats_per_row}
+            )
+        return {"id": str(theater_id), "name": name, "total_seats": rows * seats_per_row}
+
+
+@contextmanager
+def throwaway_database(prefix: str, **engine_options):
+    """A new, migrated database on the TEST_DATABASE_URL server, dropped on exit"""
+    server = create_engine(TEST_DATABASE_URL)
+    database = f"{prefix}_{uuid.uuid4().hex[:8]}"
+    with server.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text(f'CREATE DATABASE "{database}"'))
+    engine = create_engine(server.url.set(database=database), **engine_options)
+    try:
+        apply_migrations(engine)
+        yield engine
+    finally:
+        engine.dispose()
+        with server.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text(f'DROP DATABASE "{database}"'))
+        server.dispose()
+
+
+@pytest.fixture(scope="session")
+def create_database():
+    """create_database(prefix, **engine_options) -> engine of a throwaway database"""
+    if not TEST_DATABASE_URL:
+        pytest.skip("set TEST_DATABASE_URL to run the Postgres-only tests")
+    with ExitStack() as stack:
+        yield lambda prefix, **options: stack.enter_context(throwaway_database(prefix, **options))
+
+
+@pytest.fixture(scope="session")
+def postgres_engine(create_database):
+    return create_database("api_test")
+
+
+@pytest.fixture(params=BACKENDS)
+def store(request, monkeypatch):
+    monkeypatch.setattr(main, "catalog", None)
+    main.demand_cache.clear()
+    monkeypatch.setattr(main, "BULK_CHUNK_PAUSE_SECONDS", 0)
+    monkeypatch.setattr(bcrypt, "gensalt", fast_gensalt)
+
+    if request.param == "memory":
+        store = MemoryStore()
+        monkeypatch.setattr(main, "memory_repository", store.repo)
+        yield store
+        return
+
+    engine = request.getfixturevalue("postgres_engine")
+    monkeypatch.setattr(main, "memory_repository", None)
+    for sessions in (main.SessionLocal, main.ReportSessionLocal):
+        monkeypatch.setitem(sessions.kw, "bind", engine)
+    yield PostgresStore(engine)
+    with engine.begin() as conn:
+        conn.execute(text("TRUNCATE users, movies, theaters, bulk_jobs CASCADE"))
+
+
+@pytest.fixture
+def client(store):
+    return TestClient(main.app)
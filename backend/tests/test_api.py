@@ -0,0 +1,367 @@
+from datetime import date, timedelta
+from time import monotonic
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+import main
+from repositories import DeadlineExceededError, MemoryRepository, PostgresRepository
+
+TOMORROW = (date.today() + timedelta(days=1)).isoformat()
+
+
+def login(client, email: str, password: str = "secret") -> dict:
+    response = client.post("/api/auth/login", json={"email": email, "password": password})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture
+def admin(client, store):
+    store.add_user("admin@example.com", "secret", "Admin", role="admin")
+    return login(client, "admin@example.com")
+
+
+@pytest.fixture
+def users(client, store):
+    """Auth headers for three customers"""
+    headers = []
+    for i in range(3):
+        store.add_user(f"user{i}@example.com", "secret", f"User {i}")
+        headers.append(login(client, f"user{i}@example.com"))
+    return headers
+
+
+@pytest.fixture
+def theaters(store):
+    return [store.add_theater(f"Theater {i}", rows=2, seats_per_row=5) for i in range(2)]
+
+
+@pytest.fixture
+def movie(client, admin):
+    response = client.post("/api/movies", headers=admin, json={
+        "title": "Movie",
+        "description": None,
+        "poster_image": None,
+        "genre": "Drama",
+        "duration_minutes": 100,
+        "release_date": "2025-01-01",
+        "rating": "PG"
+    })
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+@pytest.fixture
+def add_showtime(client, admin, movie, theaters):
+    def add_showtime(theater: int = 0, show_date: str = TOMORROW, show_time: str = "20:00:00",
+                     price: float = 10):
+        response = client.post("/api/showtimes", headers=admin, json={
+            "movie_id": movie["id"],
+            "theater_id": theaters[theater]["id"],
+            "show_date": show_date,
+            "show_time": show_time,
+            "price": price
+        })
+        assert response.status_code == 200, response.text
+        return response.json()
+    return add_showtime
+
+
+def seat_ids(client, showtime: dict) -> list:
+    return [seat["id"] for seat in client.get(f"/api/showtimes/{showtime['id']}/seats").json()]
+
+
+def book(client, headers: dict, showtime: dict, seats: list):
+    return client.post("/api/reservations", headers=headers, json={
+        "showtime_id": showtime["id"], "seat_ids": seats
+    })
+
+
+@pytest.fixture
+def api_engine(store, request):
+    """The test database engine the API runs on; skips the in-memory run"""
+    if main.memory_repository is not None:
+        pytest.skip("needs Postgres")
+    return request.getfixturevalue("postgres_engine")
+
+
+def fail_with(error: Exception):
+    def fail(*args, **kwargs):
+        raise error
+    return fail
+
+
+# Authentication
+def test_signup_login_and_me(client):
+    response = client.post("/api/auth/signup", json={
+        "email": "new@example.com", "password": "secret", "full_name": "New"
+    })
+    assert response.status_code == 200
+    assert response.json()["role"] == "user"
+
+    headers = login(client, "new@example.com")
+    me = client.get("/api/auth/me", headers=headers).json()
+    assert me["email"] == "new@example.com"
+
+
+def test_signup_rejects_taken_email(client, users):
+    response = client.post("/api/auth/signup", json={
+        "email": "user0@example.com", "password": "secret", "full_name": "Again"
+    })
+    assert response.status_code == 400
+
+
+def test_login_rejects_wrong_password(client, users):
+    response = client.post("/api/auth/login", json={"email": "user0@example.com", "password": "wrong"})
+    assert response.status_code == 401
+
+
+def test_admin_routes_need_admin(client, users):
+    assert client.get("/api/admin/reports/summary", headers=users[0]).status_code == 403
+
+
+# Reservations
+def test_booking_conflict(client, users, add_showtime):
+    showtime = add_showtime()
+    seats = seat_ids(client, showtime)
+
+    first = book(client, users[0], showtime, seats[:2])
+    assert first.status_code == 200
+    assert first.json()["total_price"] == 20
+
+    assert book(client, users[1], showtime, seats[1:3]).status_code == 400
+
+    available = {seat["id"]: seat["is_available"] for seat in client.get(f"/api/showtimes/{showtime['id']}/seats").json()}
+    assert [available[seat] for seat in seats[:3]] == [False, False, True]
+
+
+def test_seat_of_another_theater_is_rejected(client, users, add_showtime):
+    showtime = add_showtime(theater=0)
+    other = add_showtime(theater=1)
+    assert book(client, users[0], showtime, seat_ids(client, other)[:1]).status_code == 400
+
+
+def test_cart_checkout_is_all_or_nothing(client, users, add_showtime):
+    first, second = add_showtime(theater=0), add_showtime(theater=1)
+    first_seats, second_seats = seat_ids(client, first), seat_ids(client, second)
+    assert book(client, users[1], second, second_seats[:1]).status_code == 200
+
+    cart = {"items": [
+        {"showtime_id": first["id"], "seat_ids": first_seats[:2]},
+        {"showtime_id": second["id"], "seat_ids": second_seats[:2]}
+    ]}
+    assert client.post("/api/cart/checkout", headers=users[0], json=cart).status_code == 400
+    assert client.get(f"/api/showtimes/{first['id']}").json()["available_seats"] == 10
+    assert client.get("/api/reservations", headers=users[0]).json() == []
+
+    cart["items"][1]["seat_ids"] = second_seats[1:3]
+    response = client.post("/api/cart/checkout", headers=users[0], json=cart)
+    assert response.status_code == 200
+    assert [reservation["showtime_id"] for reservation in response.json()] == [first["id"], second["id"]]
+    assert len(client.get("/api/reservations", headers=users[0]).json()) == 2
+
+
+def test_cancel_and_rebook(client, users, add_showtime):
+    showtime = add_showtime()
+    seat = seat_ids(client, showtime)[:1]
+    reservation = book(client, users[0], showtime, seat).json()
+
+    assert client.delete(f"/api/reservations/{reservation['id']}", headers=users[0]).status_code == 200
+    assert book(client, users[1], showtime, seat).status_code == 200
+
+    # Cancelling again must not free the seat the second user now holds
+    assert client.delete(f"/api/reservations/{reservation['id']}", headers=users[0]).status_code == 404
+    assert book(client, users[2], showtime, seat).status_code == 400
+
+    statuses = [r["status"] for r in client.get("/api/reservations", headers=users[0]).json()]
+    assert statuses == ["cancelled"]
+
+
+def test_cannot_cancel_another_users_reservation(client, users, add_showtime):
+    showtime = add_showtime()
+    reservation = book(client, users[0], showtime, seat_ids(client, showtime)[:1]).json()
+    assert client.delete(f"/api/reservations/{reservation['id']}", headers=users[1]).status_code == 404
+
+
+# Showtime detail
+def test_showtime_detail_etag(client, users, add_showtime):
+    showtime = add_showtime()
+    response = client.get(f"/api/showtimes/{showtime['id']}")
+    assert response.status_code == 200
+    assert response.json()["movie"]["title"] == "Movie"
+    etag = response.headers["ETag"]
+
+    cached = client.get(f"/api/showtimes/{showtime['id']}", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+
+    book(client, users[0], showtime, seat_ids(client, showtime)[:1])
+    changed = client.get(f"/api/showtimes/{showtime['id']}", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert changed.json()["available_seats"] == 9
+
+
+def test_unknown_showtime(client):
+    assert client.get("/api/showtimes/00000000-0000-0000-0000-000000000000").status_code == 404
+
+
+# Deadlines
+def test_pool_timeout_is_503(client, monkeypatch):
+    for repository in (MemoryRepository, PostgresRepository):
+        monkeypatch.setattr(repository, "list_showtimes", fail_with(PoolTimeoutError("pool exhausted")))
+    response = client.get("/api/showtimes")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+
+def test_deadline_exceeded_is_504(client, monkeypatch):
+    for repository in (MemoryRepository, PostgresRepository):
+        monkeypatch.setattr(repository, "list_showtimes", fail_with(DeadlineExceededError("Request took too long")))
+    assert client.get("/api/showtimes").status_code == 504
+
+
+def test_slow_statement_is_cancelled_at_the_deadline(client, api_engine, monkeypatch):
+    def slow_showtimes(self, *args, **kwargs):
+        self.db.execute(text("SELECT pg_sleep(5)"))
+    monkeypatch.setattr(PostgresRepository, "list_showtimes", slow_showtimes)
+    monkeypatch.setitem(main.app.dependency_overrides, main.get_repository,
+                        main.repository_dependency(main.Deadline(main.SessionLocal, 200)))
+
+    started = monotonic()
+    assert client.get("/api/showtimes").status_code == 504
+    assert monotonic() - started < 2
+    assert api_engine.pool.checkedout() == 0
+
+
+def test_reports_dont_use_the_main_pool(client, admin, api_engine, monkeypatch):
+    main_engine = create_engine(api_engine.url, pool_size=1, max_overflow=0)
+    monkeypatch.setitem(main.SessionLocal.kw, "bind", main_engine)
+    checked_out = []
+    summary_report = PostgresRepository.summary_report
+
+    def counting_summary_report(self):
+        self.db.connection()
+        checked_out.append((main_engine.pool.checkedout(), api_engine.pool.checkedout()))
+        return summary_report(self)
+    monkeypatch.setattr(PostgresRepository, "summary_report", counting_summary_report)
+
+    try:
+        assert client.get("/api/admin/reports/summary", headers=admin).status_code == 200
+    finally:
+        main_engine.dispose()
+    # Authentication's short session is closed before the report runs
+    assert checked_out == [(0, 1)]
+
+
+# Bulk jobs
+def test_cancel_showtime_job(client, admin, users, add_showtime, monkeypatch):
+    monkeypatch.setattr(main, "BULK_CHUNK_SIZE", 2)
+    showtime = add_showtime()
+    seats = seat_ids(client, showtime)
+    for i, headers in enumerate(users):
+        book(client, headers, showtime, seats[i * 2:i * 2 + 2])
+
+    job = client.post(f"/api/admin/showtimes/{showtime['id']}/cancel", headers=admin).json()
+    assert job["total"] == 3
+
+    job = client.get(f"/api/admin/jobs/{job['id']}", headers=admin).json()
+    assert job["status"] == "completed"
+    assert (job["processed"], job["reservations_cancelled"], job["refunded_amount"]) == (3, 3, 60)
+    assert client.get("/api/showtimes").json() == []
+    assert client.get("/api/admin/reports/summary", headers=admin).json()["total_reservations"] == 0
+
+
+def test_deactivate_movie_showtimes_job(client, admin, users, add_showtime, movie):
+    past = add_showtime(show_date="2020-01-01")
+    upcoming = [add_showtime(theater=i) for i in range(2)]
+    book(client, users[0], upcoming[0], seat_ids(client, upcoming[0])[:2])
+
+    job = client.post(f"/api/admin/movies/{movie['id']}/deactivate-showtimes", headers=admin).json()
+    job = client.get(f"/api/admin/jobs/{job['id']}", headers=admin).json()
+    assert (job["status"], job["total"], job["processed"], job["reservations_cancelled"]) == ("completed", 2, 2, 1)
+    assert [showtime["id"] for showtime in client.get("/api/showtimes").json()] == [past["id"]]
+
+
+def test_reprice_job(client, admin, add_showtime, monkeypatch):
+    monkeypatch.setattr(main, "BULK_CHUNK_SIZE", 1)
+    add_showtime(theater=0, show_date="2030-06-01")
+    add_showtime(theater=1, show_date="2030-06-02")
+    add_showtime(theater=0, show_date="2030-07-01")
+    reprice = {"start_date": "2030-06-01", "end_date": "2030-06-30", "price": "12.35"}
+
+    job = client.post("/api/admin/showtimes/reprice", headers=admin, json=reprice).json()
+    job = client.get(f"/api/admin/jobs/{job['id']}", headers=admin).json()
+    assert (job["status"], job["total"], job["processed"]) == ("completed", 2, 2)
+    assert [showtime["price"] for showtime in client.get("/api/showtimes").json()] == [12.35, 12.35, 10]
+
+    reprice["price"] = "12.345"
+    assert client.post("/api/admin/showtimes/reprice", headers=admin, json=reprice).status_code == 422
+
+
+def test_unknown_job(client, admin):
+    assert client.get("/api/admin/jobs/not-a-job", headers=admin).status_code == 404
+    assert client.get(f"/api/admin/jobs/{'0' * 32}", headers=admin).status_code == 404
+
+
+# Analytics
+def test_seat_demand(client, admin, users, add_showtime, theaters):
+    yesterday = (date.today() - timedelta(days=1)).isoformat()
+    showtime = add_showtime(show_date=yesterday)
+    add_showtime(theater=1, show_date=yesterday)
+    book(client, users[0], showtime, seat_ids(client, showtime)[:5])
+
+    response = client.get(f"/api/admin/analytics/theaters/{theaters[0]['id']}/demand", headers=admin)
+    assert response.status_code == 200
+    demand = response.json()
+    assert (demand["showtimes"], demand["bookings"], demand["fill_rate"]) == (1, 5, 0.5)
+    assert demand["seat_heatmap"]["fill_rate"][0] == [1, 1, 1, 1, 1]
+    assert demand["seat_types"][0]["bookings"] == 5
+
+
+def test_seat_demand_of_a_theater_without_seats(client, admin, store, movie):
+    empty = store.add_theater("Empty", rows=0, seats_per_row=0)
+    client.post("/api/showtimes", headers=admin, json={
+        "movie_id": movie["id"],
+        "theater_id": empty["id"],
+        "show_date": (date.today() - timedelta(days=1)).isoformat(),
+        "show_time": "20:00:00",
+        "price": 10
+    })
+    response = client.get(f"/api/admin/analytics/theaters/{empty['id']}/demand", headers=admin)
+    assert response.status_code == 200
+    demand = response.json()
+    assert (demand["showtimes"], demand["bookings"], demand["fill_rate"]) == (1, 0, None)
+    assert demand["seat_heatmap"] == {"rows": [], "seat_numbers": [], "fill_rate": [], "mean_lead_hours": []}
+    assert (demand["slot_heatmap"]["hours"], demand["slot_heatmap"]["shows"][0]) == ([], [])
+    assert demand["sellout_curve"]["days_before_show"][-1] == 0
+    assert demand["sellout_curve"]["mean_fill_rate"][-1] is None
+    assert (demand["sellout_curve"]["sold_out_shows"], demand["seat_types"]) == (0, [])
+
+
+def test_seat_demand_has_the_same_shape_without_showtimes(client, admin, users, add_showtime, theaters):
+    yesterday = (date.today() - timedelta(days=1)).isoformat()
+    showtime = add_showtime(show_date=yesterday)
+    book(client, users[0], showtime, seat_ids(client, showtime)[:1])
+    url = f"/api/admin/analytics/theaters/{theaters[0]['id']}/demand"
+
+    def shape(value):
+        return {key: shape(item) for key, item in value.items()} if isinstance(value, dict) else None
+    demand = client.get(url, headers=admin).json()
+    empty = client.get(url, headers=admin, params={"end_date": "2020-01-01"}).json()
+    assert empty["showtimes"] == 0
+    assert shape(empty) == shape(demand)
+
+
+def test_seat_demand_cache_is_bounded(client, admin, theaters, monkeypatch):
+    monkeypatch.setattr(main, "DEMAND_CACHE_SIZE", 2)
+    url = f"/api/admin/analytics/theaters/{theaters[0]['id']}/demand"
+    for day in range(1, 5):
+        assert client.get(url, headers=admin, params={"end_date": f"2024-01-0{day}"}).status_code == 200
+    assert [key[2] for key in main.demand_cache] == [date(2024, 1, 3), date(2024, 1, 4)]
+
+
+def test_seat_demand_of_an_unknown_theater(client, admin):
+    response = client.get(f"/api/admin/analytics/theaters/{'0' * 32}/demand", headers=admin)
+    assert response.status_code == 404
@@ -0,0 +1,25 @@
+"""
+Concurrent cart checkout on Postgres (needs TEST_DATABASE_URL).
+
+A small run of stress_checkout.py: overlapping carts must never deadlock,
+fail unexpectedly, double-book a seat or leave a partial cart behind.
+"""
+
+from sqlalchemy import text
+
+from stress_checkout import run_checkouts
+
+THREADS = 4
+CARTS_PER_THREAD = 10
+
+
+def test_concurrent_checkouts(postgres_engine):
+    try:
+        results, problems = run_checkouts(postgres_engine, THREADS, CARTS_PER_THREAD)
+    finally:
+        with postgres_engine.begin() as conn:
+            conn.execute(text("TRUNCATE users, movies, theaters, bulk_jobs CASCADE"))
+
+    assert (results["deadlock"], results["error"]) == (0, 0)
+    assert problems == []
+    assert results["booked"] > 0
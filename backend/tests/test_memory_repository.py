@@ -0,0 +1,47 @@
+from datetime import date, time, timedelta
+
+import pytest
+
+from repositories import ConflictError, MemoryRepository
+
+
+@pytest.fixture
+def repo():
+    return MemoryRepository()
+
+
+@pytest.fixture
+def showtime(repo):
+    theater = repo.add_theater("Theater 1", rows=2, seats_per_row=5)
+    movie = repo.create_movie({
+        "title": "Movie",
+        "description": None,
+        "poster_image": None,
+        "genre": "Drama",
+        "duration_minutes": 100,
+        "release_date": None,
+        "rating": None
+    })
+    return repo.create_showtime({
+        "movie_id": movie["id"],
+        "theater_id": theater["id"],
+        "show_date": date.today() + timedelta(days=1),
+        "show_time": time(20),
+        "price": 10.0
+    })
+
+
+def test_cancelling_twice_keeps_the_rebooked_seat(repo, showtime):
+    seat_id = repo.get_seat_layouts()[showtime["theater_id"]][0]["id"]
+    first, second, third = (repo.add_user(f"u{i}@example.com", "x", f"U{i}")["id"] for i in range(3))
+
+    reservation = repo.reserve_seats(first, {showtime["id"]: [seat_id]})[0]
+    repo.cancel_reservation(reservation["id"], reservation["show_date"])
+    repo.reserve_seats(second, {showtime["id"]: [seat_id]})
+
+    repo.cancel_reservation(reservation["id"], reservation["show_date"])
+
+    assert repo.get_booked_seats(showtime["id"])[1] == {seat_id}
+    with pytest.raises(ConflictError):
+        repo.reserve_seats(third, {showtime["id"]: [seat_id]})
+    assert repo.summary_report()["total_reservations"] == 1
@@ -0,0 +1,199 @@
+"""
+EXPLAIN regression check for the API's hot queries.
+
+Needs TEST_DATABASE_URL. A throwaway database is migrated and filled with a
+generated dataset, then each endpoint's query must not fall back to a
+sequential scan on one of the large tables.
+
+The check is only meaningful at a realistic size: on tiny tables a sequential
+scan is the cheapest plan, so keep PLAN_CHECK_SCALE at its default or above.
+"""
+
+import os
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import text
+
+from repositories.postgres import (
+    BOOKED_SEATS_SQL, CANCEL_RESERVATIONS_CHUNK_SQL, CONFIRMED_RESERVATION_SQL,
+    LIST_SHOWTIMES_SQL, LOCK_AVAILABLE_SEATS_SQL, LOCK_SHOWTIMES_SQL, OCCUPANCY_SQL,
+    RESERVATION_REPORT_SQL, RESERVATION_SEATS_SQL, SHOWTIME_DETAIL_SQL, SUMMARY_REPORT_SQL,
+    THEATER_SEATS_SQL, THEATER_SHOWTIMES_SQL, USER_RESERVATIONS_SQL
+)
+
+# Dataset size multiplier
+PLAN_CHECK_SCALE = int(os.getenv("PLAN_CHECK_SCALE", "10"))
+
+LARGE_TABLES = ("reservations", "reservation_seats", "showtimes", "seats", "users")
+
+# Partitions below this size (e.g. empty future months) may be scanned freely.
+MIN_ROWS = 10000
+
+# The repository's own queries, with the filters the API appends. Each entry
+# is (name, sql, tables allowed to be scanned sequentially).
+QUERIES = [
+    ("get_showtimes?movie_id", LIST_SHOWTIMES_SQL + """
+        AND s.movie_id = :movie_id AND s.show_date = :show_date
+        ORDER BY s.show_date, s.show_time
+    """, ()),
+    ("get_showtimes?show_date", LIST_SHOWTIMES_SQL + """
+        AND s.show_date = :show_date
+        ORDER BY s.show_date, s.show_time
+    """, ()),
+    ("get_showtime_seats", BOOKED_SEATS_SQL, ()),
+    ("get_showtime_detail", SHOWTIME_DETAIL_SQL, ()),
+    ("reserve_seats:showtimes", LOCK_SHOWTIMES_SQL, ()),
+    ("reserve_seats:seats", LOCK_AVAILABLE_SEATS_SQL, ()),
+    ("get_user_reservations", USER_RESERVATIONS_SQL, ()),
+    ("get_user_reservations:seats", RESERVATION_SEATS_SQL, ()),
+    ("cancel_reservation", CONFIRMED_RESERVATION_SQL, ()),
+    ("cancel_showtime_reservations", CANCEL_RESERVATIONS_CHUNK_SQL, ()),
+    ("get_reservation_report", RESERVATION_REPORT_SQL + """
+        AND show_date >= :show_date AND show_date <= :show_date
+        ORDER BY show_date, show_time
+    """, ()),
+    ("get_seat_demand:seats", THEATER_SEATS_SQL, ()),
+    ("get_seat_demand:showtimes", THEATER_SHOWTIMES_SQL, ()),
+    ("get_seat_demand:occupancy", OCCUPANCY_SQL, ()),
+    # The overall summary aggregates every confirmed reservation, so a full
+    # scan is the expected plan.
+    ("get_summary_report", SUMMARY_REPORT_SQL, ("reservations", "reservation_seats")),
+]
+
+DATASET_SQL = [
+    """
+    INSERT INTO theaters (name, total_seats)
+    SELECT 'Theater ' || g, 150 FROM generate_series(1, :theaters) g
+    """,
+    """
+    INSERT INTO seats (theater_id, row_label, seat_number, seat_type)
+    SELECT t.id, chr(64 + r), n,
+           CASE WHEN r > 8 THEN 'vip' WHEN r > 5 THEN 'premium' ELSE 'standard' END
+    FROM theaters t, generate_series(1, 10) r, generate_series(1, 15) n
+    """,
+    """
+    INSERT INTO movies (title, genre, duration_minutes, release_date)
+    SELECT 'Movie ' || g,
+           (ARRAY['Action', 'Drama', 'Comedy', 'Horror'])[1 + g % 4],
+           90 + g % 60, DATE '2024-01-01' + g
+    FROM generate_series(1, :movies) g
+    """,
+    """
+    INSERT INTO users (email, password_hash, full_name)
+    SELECT 'user' || g || '@example.com', 'x', 'User ' || g
+    FROM generate_series(1, :users) g
+    """,
+    """
+    WITH m AS (SELECT array_agg(id) AS ids FROM movies)
+    INSERT INTO showtimes (movie_id, theater_id, show_date, show_time, price)
+    SELECT m.ids[1 + abs(hashtext(t.id::text || d::text || slot)) % array_length(m.ids, 1)],
+           t.id, CURRENT_DATE - :days / 2 + d, TIME '10:00' + slot * INTERVAL '3 hours',
+           10 + slot
+    FROM m, theaters t, generate_series(0, :days - 1) d, generate_series(0, 4) slot
+    """,
+    """
+    SELECT create_reservation_partitions(MIN(show_date), MAX(show_date)) FROM showtimes
+    """,
+    """
+    WITH u AS (SELECT array_agg(id) AS ids FROM users)
+    INSERT INTO reservations
+        (user_id, showtime_id, show_date, total_price, booking_reference, status, created_at)
+    SELECT u.ids[1 + abs(hashtext(s.id::text || k)) % array_length(u.ids, 1)],
+           s.id, s.show_date, s.price * 2, upper(substr(md5(s.id::text || k), 1, 16)),
+           CASE WHEN k % 10 = 0 THEN 'cancelled' ELSE 'confirmed' END,
+           s.show_date - (k % 30) * INTERVAL '1 day'
+    FROM u, showtimes s, generate_series(1, :per_showtime) k
+    """,
+    """
+    INSERT INTO reservation_seats (reservation_id, showtime_id, show_date, seat_id)
+    SELECT r.id, r.showtime_id, r.show_date, se.id
+    FROM (
+        SELECT id, showtime_id, show_date,
+               row_number() OVER (PARTITION BY showtime_id ORDER BY id) AS rn
+        FROM reservations
+    ) r
+    JOIN showtimes s ON s.id = r.showtime_id
+    JOIN LATERAL (
+        SELECT id FROM seats
+        WHERE theater_id = s.theater_id
+        ORDER BY row_label, seat_number
+        OFFSET (r.rn - 1) * 2 LIMIT 2
+    ) se ON true
+    """,
+]
+
+SAMPLE_PARAMS_SQL = """
+    SELECT r.showtime_id, s.movie_id, s.show_date, r.user_id, r.id,
+           ARRAY(SELECT id FROM seats WHERE theater_id = s.theater_id LIMIT 4),
+           s.theater_id
+    FROM reservations r
+    JOIN showtimes s ON r.showtime_id = s.id
+    WHERE s.show_date = CURRENT_DATE
+    LIMIT 1
+"""
+
+
+def build_dataset(conn, scale: int):
+    sizes = {
+        "theaters": 4 * scale,
+        "movies": 50 * scale,
+        "users": 2000 * scale,
+        "days": 90,
+        "per_showtime": 10,
+    }
+    for sql in DATASET_SQL:
+        conn.execute(text(sql), sizes)
+    conn.execute(text("ANALYZE"))
+
+
+def find_seq_scans(plan: dict, allowed, row_counts: dict) -> list:
+    found = []
+    relation = plan.get("Relation Name", "")
+    if (
+        plan.get("Node Type") == "Seq Scan"
+        and row_counts.get(relation, 0) >= MIN_ROWS
+        and any(
+            relation == table or relation.startswith(table + "_p")
+            for table in LARGE_TABLES if table not in allowed
+        )
+    ):
+        found.append(relation)
+    for child in plan.get("Plans", []):
+        found.extend(find_seq_scans(child, allowed, row_counts))
+    return found
+
+
+@pytest.fixture(scope="module")
+def plan_database(create_database):
+    """(engine, query params, row count per table) of the generated dataset"""
+    engine = create_database("plan_check")
+    with engine.begin() as conn:
+        build_dataset(conn, PLAN_CHECK_SCALE)
+        row = conn.execute(text(SAMPLE_PARAMS_SQL)).fetchone()
+        row_counts = dict(conn.execute(text(
+            "SELECT relname, reltuples FROM pg_class WHERE relkind = 'r'"
+        )).fetchall())
+    params = {
+        "showtime_id": row[0],
+        "movie_id": row[1],
+        "show_date": row[2],
+        "user_id": row[3],
+        "reservation_id": row[4],
+        "seat_ids": row[5],
+        "showtime_ids": [row[0]] * len(row[5]),
+        "theater_id": row[6],
+        "start_date": row[2] - timedelta(days=30),
+        "end_date": row[2],
+        "chunk_size": 500,
+    }
+    return engine, params, row_counts
+
+
+@pytest.mark.parametrize("sql, allowed", [query[1:] for query in QUERIES],
+                         ids=[query[0] for query in QUERIES])
+def test_query_plan_uses_indexes(plan_database, sql, allowed):
+    engine, params, row_counts = plan_database
+    with engine.connect() as conn:
+        plan = conn.execute(text("EXPLAIN (FORMAT JSON) " + sql), params).scalar()
+    assert find_seq_scans(plan[0]["Plan"], allowed, row_counts) == []
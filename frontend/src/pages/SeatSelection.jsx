@@ -13,16 +13,12 @@ const SeatSelection = () => {
 
   const fetchShowtimeAndSeats = useCallback(async () => {
     try {
-      const [showtimeRes, seatsRes] = await Promise.all([
-        axios.get("http://localhost:8000/api/showtimes", {
-          params: { movie_id: null },
-        }),
-        axios.get(`http://localhost:8000/api/showtimes/${showtimeId}/seats`),
-      ]);
-
-      const currentShowtime = showtimeRes.data.find((s) => s.id === showtimeId);
-      setShowtime(currentShowtime);
-      setSeats(seatsRes.data);
+      const response = await axios.get(
+        `http://localhost:8000/api/showtimes/${showtimeId}`
+      );
+
+      setShowtime(response.data);
+      setSeats(response.data.seats);
     } catch (error) {
       console.error("Error fetching data:", error);
     } finally {